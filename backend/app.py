@@ -1,25 +1,143 @@
 
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, Response, current_app, g, has_request_context, make_response, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager, create_access_token, get_jwt_identity, jwt_required
+from flask_jwt_extended import JWTManager, create_access_token, get_jwt_identity, jwt_required, verify_jwt_in_request
+from flask_jwt_extended.exceptions import JWTExtendedException
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timedelta
+from jwt.exceptions import PyJWTError
+from sqlalchemy import event, insert_sentinel
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.datastructures import MultiDict
+from werkzeug.local import LocalProxy
+from werkzeug.security import generate_password_hash
+from datetime import date, datetime, timedelta
+from functools import wraps
+from urllib.parse import urlencode
+from cache import create_cache
+from changefeed import ChangeNotifier, format_event
+from engine_profile import apply_sqlite_pragmas, engine_options, is_memory_sqlite
+from json_provider import FastJSONProvider
+from metrics import MetricsRegistry, RequestStats
+from migrations import explain_query_plan, full_table_scans, run_migrations, temp_sorts
+from passwords import AttemptThrottle, HashPoolBusy, PasswordHasher
+from tasks import Progress, TaskWorkers
+from timeseries import PERIODS, fill_series, rebuild_rollups, rollup_increments, rollup_rows, series_buckets
+import base64
+import cProfile
+import click
+import csv
+import glob
+import hashlib
+import hmac
+import io
+import json
 import os
+import pstats
+import shutil
+import time
+import uuid
+import zlib
 
-# Initialize Flask app
-app = Flask(__name__)
-CORS(app, supports_credentials=True)
+# Extensions are created unbound; create_app() attaches them to an app without touching the database
+db = SQLAlchemy()
+jwt = JWTManager()
+api = Blueprint('api', __name__, cli_group=None)
 
-# Configure SQLite database
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///leadcampaign.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'your-secret-key')  # Change in production
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(days=1)
+def load_config(app):
+    # Configure the database; DATABASE_URL can point at a server database instead of SQLite
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///leadcampaign.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['DB_PROFILE'] = os.environ.get('DB_PROFILE', 'tuned')  # tuned or baseline, see engine_profile.py
+    app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 10))
+    app.config['DB_MAX_OVERFLOW'] = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'your-secret-key')  # Change in production
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(days=1)
 
-# Initialize JWT and SQLAlchemy
-jwt = JWTManager(app)
-db = SQLAlchemy(app)
+    # Password hashing runs in a bounded process pool (HASH_WORKERS=0 hashes in the request thread)
+    app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    app.config['HASH_WORKERS'] = int(os.environ.get('HASH_WORKERS', min(os.cpu_count() or 1, 4)))
+    app.config['HASH_QUEUE_LIMIT'] = int(os.environ.get('HASH_QUEUE_LIMIT', 16))
+    app.config['HASH_TIMEOUT'] = float(os.environ.get('HASH_TIMEOUT', 10))
+    app.config['AUTH_EMAIL_ATTEMPT_LIMIT'] = int(os.environ.get('AUTH_EMAIL_ATTEMPT_LIMIT', 10))  # Login attempts per email per window
+    app.config['AUTH_IP_ATTEMPT_LIMIT'] = int(os.environ.get('AUTH_IP_ATTEMPT_LIMIT', 100))  # Auth attempts per client IP per window
+    app.config['AUTH_ATTEMPT_WINDOW'] = int(os.environ.get('AUTH_ATTEMPT_WINDOW', 60))
+
+    # Response cache for the public campaign read endpoints: memory, local-shared, redis or none
+    app.config['CACHE_BACKEND'] = os.environ.get('CACHE_BACKEND', 'memory')
+    app.config['CACHE_TTL'] = int(os.environ.get('CACHE_TTL', 30))
+    app.config['CACHE_MAX_ENTRIES'] = int(os.environ.get('CACHE_MAX_ENTRIES', 1024))
+    app.config['CACHE_MAX_BYTES'] = int(os.environ.get('CACHE_MAX_BYTES', 64 * 1024 * 1024))  # Total size of the cached bodies
+    app.config['CACHE_REDIS_URL'] = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+
+    # /metrics is open unless METRICS_TOKEN is set, then scrapers send it as X-Metrics-Token
+    app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+    app.config['PROFILE_TOP_FUNCTIONS'] = int(os.environ.get('PROFILE_TOP_FUNCTIONS', 40))
+
+    # Background tasks: threads per web process (0 leaves them to `flask worker`), result retention and files
+    app.config['TASK_WORKERS'] = int(os.environ.get('TASK_WORKERS', 2))
+    app.config['TASK_POLL_INTERVAL'] = float(os.environ.get('TASK_POLL_INTERVAL', 1))
+    app.config['TASK_RESULT_TTL'] = int(os.environ.get('TASK_RESULT_TTL', 86400))
+    app.config['TASK_STALE_AFTER'] = int(os.environ.get('TASK_STALE_AFTER', 600))  # Running tasks without progress for this long are failed
+    app.config['TASK_RESULT_DIR'] = os.environ.get('TASK_RESULT_DIR')  # Defaults to instance/task_results
+
+    # Campaign change feed: changes kept for Last-Event-ID resume, and the SSE timings (see changefeed.py)
+    app.config['CHANGE_LOG_SIZE'] = int(os.environ.get('CHANGE_LOG_SIZE', 10000))
+    app.config['CHANGES_HEARTBEAT'] = float(os.environ.get('CHANGES_HEARTBEAT', 15))
+    app.config['CHANGES_POLL_INTERVAL'] = float(os.environ.get('CHANGES_POLL_INTERVAL', 1))
+    app.config['CHANGES_RETRY'] = int(os.environ.get('CHANGES_RETRY', 3000))  # Reconnect delay sent to clients, in ms
+    app.config['CHANGES_QUEUE_SIZE'] = int(os.environ.get('CHANGES_QUEUE_SIZE', 1000))  # Pending events per stream before it must resync
+
+# Per-app services, set up by create_app() and reached through the current app like db
+cache = LocalProxy(lambda: current_app.extensions['response_cache'])
+hasher = LocalProxy(lambda: current_app.extensions['password_hasher'])
+email_throttle = LocalProxy(lambda: current_app.extensions['email_throttle'])
+ip_throttle = LocalProxy(lambda: current_app.extensions['ip_throttle'])
+task_workers = LocalProxy(lambda: current_app.extensions['task_workers'])
+change_notifier = LocalProxy(lambda: current_app.extensions['change_notifier'])
+
+# Request metrics, labelled by route pattern so the number of series stays bounded
+metrics = MetricsRegistry()
+request_latency = metrics.histogram('http_request_duration_seconds', 'Request latency, streamed bodies included', ['method', 'route', 'status'])
+request_queries = metrics.histogram('http_request_db_queries', 'SQL statements executed per request', ['route'], buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100, 250, 1000))
+request_query_time = metrics.histogram('http_request_db_seconds', 'Time spent in SQL statements per request', ['route'])
+task_duration = metrics.histogram('background_task_duration_seconds', 'Run time of background tasks run by this process', ['kind', 'status'], buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600))
+request_serialization_time = metrics.histogram('http_request_serialization_seconds', 'Time spent serializing response payloads per request', ['route'])
+metrics.gauge('response_cache_hits', 'Response cache hits since start', lambda: cache.stats()['hits'])
+metrics.gauge('response_cache_misses', 'Response cache misses since start', lambda: cache.stats()['misses'])
+
+def current_request_stats():
+    return g.get('request_stats') if has_request_context() else None
+
+def serialization_timer(func):
+    # Adds the time spent in func to the current request's serialization total
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats = current_request_stats()
+            if stats is not None:
+                stats.serialization_seconds += time.perf_counter() - started
+    return wrapper
+
+class TimedJSONProvider(FastJSONProvider):
+    dumps = serialization_timer(FastJSONProvider.dumps)
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    stats = current_request_stats()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_seconds += elapsed
+
+def instrument_engine(engine):
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
 
 # Define database models
 class User(db.Model):
@@ -38,6 +156,19 @@ class User(db.Model):
             'role': self.role
         }
 
+class Tag(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+
+# Campaign <-> tag links; position keeps the order the tags were given in
+campaign_tags = db.Table(
+    'campaign_tags',
+    db.Column('campaign_id', db.Integer, db.ForeignKey('campaign.id'), primary_key=True),
+    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id'), primary_key=True),
+    db.Column('position', db.Integer, nullable=False, default=0),
+    db.Index('ix_campaign_tags_tag_id_campaign_id', 'tag_id', 'campaign_id')
+)
+
 class Campaign(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -54,43 +185,1560 @@ class Campaign(db.Model):
     message_template = db.Column(db.Text)
     owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_date = db.Column(db.String(10), nullable=False)
-    tags = db.Column(db.Text)  # Store as comma-separated values
+    # Lets a many-row INSERT .. RETURNING match ids to rows without falling back to one statement per row
+    _sentinel = insert_sentinel('_sentinel')
+
+    # Keep in step with the matching migration in migrations.py
+    __table_args__ = (
+        db.Index('ix_campaign_owner_id_status', 'owner_id', 'status'),
+        db.Index('ix_campaign_owner_id_id', 'owner_id', 'id'),
+        db.Index('ix_campaign_status_created_date', 'status', 'created_date'),
+        db.Index('ix_campaign_platform', 'platform'),
+    )
+
+class CampaignStatsSnapshot(db.Model):
+    # Running per-owner, per-platform totals kept in step by the campaign write routes
+    owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    platform = db.Column(db.String(50), primary_key=True)
+    campaigns = db.Column(db.Integer, nullable=False, default=0)
+    active = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    draft = db.Column(db.Integer, nullable=False, default=0)
+    budget = db.Column(db.Float, nullable=False, default=0)
+    leads = db.Column(db.Integer, nullable=False, default=0)
+    conversions = db.Column(db.Integer, nullable=False, default=0)
+    rate_sum = db.Column(db.Float, nullable=False, default=0)
+    rate_count = db.Column(db.Integer, nullable=False, default=0)
+
+class DataVersion(db.Model):
+    # Monotonic change counters: 'global' for the public list, 'user:<id>' per campaign owner
+    scope = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class CampaignMetricEvent(db.Model):
+    # Append-only log of leads/responses changes; no foreign key so the history outlives the campaign
+    id = db.Column(db.Integer, primary_key=True)
+    campaign_id = db.Column(db.Integer, nullable=False, index=True)
+    owner_id = db.Column(db.Integer, nullable=False)
+    platform = db.Column(db.String(50), nullable=False)
+    day = db.Column(db.String(10), nullable=False)
+    recorded_at = db.Column(db.String(19), nullable=False)
+    leads_delta = db.Column(db.Integer, nullable=False, default=0)
+    responses_delta = db.Column(db.Integer, nullable=False, default=0)
+
+class CampaignMetricRollup(db.Model):
+    # Event sums per campaign, user or platform and per day or week (bucket is the first day, weeks start Monday)
+    scope = db.Column(db.String(10), primary_key=True)
+    scope_id = db.Column(db.String(50), primary_key=True)
+    period = db.Column(db.String(4), primary_key=True)
+    bucket = db.Column(db.String(10), primary_key=True)
+    leads = db.Column(db.Integer, nullable=False, default=0)
+    responses = db.Column(db.Integer, nullable=False, default=0)
+    events = db.Column(db.Integer, nullable=False, default=0)
+
+class Task(db.Model):
+    # Background work queued by the API; run by task workers (see tasks.py) and deleted once expires_at passes
+    id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    owner_id = db.Column(db.Integer, nullable=False, index=True)
+    status = db.Column(db.String(10), nullable=False, default='queued')  # queued, running, done or failed
+    params = db.Column(db.Text, nullable=False)
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer)
+    result = db.Column(db.Text)
+    result_file = db.Column(db.String(255))
+    error = db.Column(db.Text)
+    created_at = db.Column(db.String(19), nullable=False)
+    started_at = db.Column(db.String(19))
+    updated_at = db.Column(db.String(19), nullable=False)
+    finished_at = db.Column(db.String(19))
+    expires_at = db.Column(db.String(19))
+
+    __table_args__ = (
+        db.Index('ix_task_status_created_at', 'status', 'created_at'),
+    )
 
     def to_dict(self):
-        return {
-            'id': str(self.id),
-            'name': self.name,
-            'description': self.description,
-            'target_audience': self.target_audience,
-            'platform': self.platform,
-            'budget': self.budget,
-            'start_date': self.start_date,
-            'end_date': self.end_date,
+        data = {
+            'id': self.id,
+            'kind': self.kind,
             'status': self.status,
-            'leads_count': self.leads_count,
-            'responses_count': self.responses_count,
-            'conversion_rate': self.conversion_rate,
-            'message_template': self.message_template,
-            'owner_id': str(self.owner_id),
-            'owner_name': self.owner.name,
-            'created_date': self.created_date,
-            'tags': self.tags.split(',') if self.tags else []
+            'progress': self.progress,
+            'total': self.total,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'expires_at': self.expires_at
+        }
+        if self.status == 'done':
+            data['result'] = json.loads(self.result) if self.result else None
+            data['result_url'] = f'/api/tasks/{self.id}/result'
+        return data
+
+class CampaignChange(db.Model):
+    # Bounded log behind the change feed; AUTOINCREMENT so ids are never reused after pruning
+    id = db.Column(db.Integer, primary_key=True)
+    campaign_id = db.Column(db.Integer, nullable=False)
+    owner_id = db.Column(db.Integer, nullable=False)
+    action = db.Column(db.String(10), nullable=False)  # created, updated or deleted
+    public = db.Column(db.Boolean, nullable=False)  # Not a draft before or after the change
+    changed_at = db.Column(db.String(19), nullable=False)
+
+    __table_args__ = {'sqlite_autoincrement': True}
+
+STATS_COUNTERS = ('campaigns', 'active', 'completed', 'draft', 'budget', 'leads', 'conversions', 'rate_sum', 'rate_count')
+
+def dialect_insert(table):
+    # INSERT .. ON CONFLICT is dialect specific; SQLite and PostgreSQL share the same API
+    if db.engine.dialect.name == 'postgresql':
+        # Imported here: the PostgreSQL dialect adds ~50 ms to every SQLite worker's import
+        from sqlalchemy.dialects import postgresql
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+# Campaign tags
+def campaign_tags_query(campaign_ids):
+    return (
+        db.select(campaign_tags.c.campaign_id, Tag.name)
+        .join(Tag, Tag.id == campaign_tags.c.tag_id)
+        .where(campaign_tags.c.campaign_id.in_(campaign_ids))
+        .order_by(campaign_tags.c.campaign_id, campaign_tags.c.position)
+    )
+
+def group_campaign_tags(rows):
+    tags = {}
+    for campaign_id, name in rows:
+        tags.setdefault(campaign_id, []).append(name)
+    return tags
+
+def load_campaign_tags(campaign_ids):
+    # Map campaign id -> ordered tag names with one query for the whole batch
+    if not campaign_ids:
+        return {}
+    return group_campaign_tags(db.session.execute(campaign_tags_query(campaign_ids)))
+
+def tag_ids_for(names):
+    # Resolve tag names to ids, creating any that do not exist yet
+    if not names:
+        return {}
+    ids = dict(db.session.execute(db.select(Tag.name, Tag.id).where(Tag.name.in_(names))).all())
+    missing = [name for name in names if name not in ids]
+    if missing:
+        db.session.execute(dialect_insert(Tag).values([{'name': name} for name in missing]).on_conflict_do_nothing())
+        ids.update(db.session.execute(db.select(Tag.name, Tag.id).where(Tag.name.in_(missing))).all())
+    return ids
+
+def set_campaign_tags(campaign_id, names):
+    set_tags_for_campaigns({campaign_id: names})
+
+def set_tags_for_campaigns(tags_by_campaign):
+    # Replace the tags of many campaigns with a fixed number of statements
+    tags_by_campaign = {
+        campaign_id: list(dict.fromkeys(name for name in names or [] if name))
+        for campaign_id, names in tags_by_campaign.items()
+    }
+    ids = tag_ids_for(list({name for names in tags_by_campaign.values() for name in names}))
+    db.session.execute(db.delete(campaign_tags).where(campaign_tags.c.campaign_id.in_(list(tags_by_campaign))))
+    links = [
+        {'campaign_id': campaign_id, 'tag_id': ids[name], 'position': position}
+        for campaign_id, names in tags_by_campaign.items()
+        for position, name in enumerate(names)
+    ]
+    if links:
+        db.session.execute(db.insert(campaign_tags), links)
+
+def parse_tag_filter(args):
+    names = [name.strip() for name in args.get('tags', '').split(',') if name.strip()]
+    match = args.get('match', 'any')
+    if match not in ('any', 'all'):
+        raise ValueError('match must be "any" or "all"')
+    return list(dict.fromkeys(names)), match
+
+def tagged_campaign_ids(names, match):
+    # Resolved through the tag index rather than scanning campaigns
+    query = (
+        db.select(campaign_tags.c.campaign_id)
+        .join(Tag, Tag.id == campaign_tags.c.tag_id)
+        .where(Tag.name.in_(names))
+    )
+    if match == 'all':
+        query = query.group_by(campaign_tags.c.campaign_id).having(db.func.count() == len(names))
+    return query
+
+# Full-text search over the campaign_fts index (SQLite FTS5, see migration 3)
+SEARCH_COLUMNS = ['name', 'description', 'target_audience', 'message_template']
+campaign_fts = db.table('campaign_fts', db.column('rowid'))
+CAMPAIGN_SEARCH_RANK = db.literal_column('campaign_search.rank')
+
+def campaign_search(q, dialect):
+    # Subquery of (campaign_id, rank) for the campaigns matching every search term; lower rank is better.
+    # dialect is the database's dialect name, taken from the caller's engine (async handlers have no app context)
+    terms = q.split()
+    if dialect == 'sqlite':
+        # Each term is quoted so user input cannot use FTS5 query syntax, and prefix-matched for search-as-you-type
+        match = ' '.join('"' + term.replace('"', '""') + '"*' for term in terms)
+        query = (
+            db.select(campaign_fts.c.rowid.label('campaign_id'), db.func.bm25(db.literal_column('campaign_fts')).label('rank'))
+            .select_from(campaign_fts)
+            .where(db.literal_column('campaign_fts').op('MATCH')(match))
+        )
+    else:
+        # Other databases have no campaign_fts; match each term anywhere, without ranking
+        query = db.select(Campaign.id.label('campaign_id'), db.literal(0.0).label('rank'))
+        for term in terms:
+            query = query.where(db.or_(*[getattr(Campaign, column).ilike(f'%{term}%') for column in SEARCH_COLUMNS]))
+    return query.subquery('campaign_search')
+
+# Range filters: query parameter -> (column, comparison)
+RANGE_FILTERS = {
+    'budget_min': (Campaign.budget, '>='),
+    'budget_max': (Campaign.budget, '<='),
+    # Dates are stored as YYYY-MM-DD strings, so string comparison orders them correctly
+    'created_from': (Campaign.created_date, '>='),
+    'created_to': (Campaign.created_date, '<='),
+    'start_from': (Campaign.start_date, '>='),
+    'start_to': (Campaign.start_date, '<='),
+    'end_from': (Campaign.end_date, '>='),
+    'end_to': (Campaign.end_date, '<=')
+}
+
+def apply_campaign_filters(query, args, dialect):
+    names, match = parse_tag_filter(args)
+    if names:
+        query = query.where(Campaign.id.in_(tagged_campaign_ids(names, match)))
+    if args.get('status'):
+        query = query.where(Campaign.status.in_(args['status'].split(',')))
+    if args.get('platform'):
+        query = query.where(Campaign.platform.in_(args['platform'].split(',')))
+    for name, (column, comparison) in RANGE_FILTERS.items():
+        value = args.get(name)
+        if not value:
+            continue
+        try:
+            # Dates are written back as YYYY-MM-DD so the string comparison holds for any ISO form accepted
+            value = float(value) if column is Campaign.budget else date.fromisoformat(value).isoformat()
+        except ValueError:
+            raise ValueError(f'{name} must be a number' if column is Campaign.budget else f'{name} must be a YYYY-MM-DD date')
+        query = query.where(column >= value if comparison == '>=' else column <= value)
+    if args.get('q', '').strip():
+        search = campaign_search(args['q'], dialect)
+        query = query.join(search, search.c.campaign_id == Campaign.id)
+    return query
+
+# Data versions and conditional GETs
+def bump_data_versions(owner_ids):
+    # Runs inside the write transaction so a version never moves without its data
+    table = DataVersion.__table__
+    stmt = dialect_insert(table).on_conflict_do_update(index_elements=[table.c.scope], set_={'version': table.c.version + 1})
+    scopes = ['global'] + [f'user:{owner_id}' for owner_id in sorted(set(owner_ids))]
+    db.session.execute(stmt, [{'scope': scope, 'version': 1} for scope in scopes])
+
+def data_version_query(scope):
+    return db.select(DataVersion.version).where(DataVersion.scope == scope)
+
+def data_version(scope):
+    return db.session.scalar(data_version_query(scope)) or 0
+
+def compute_etag(scope, version, path, args):
+    representation = f'{scope}:{version}:{path}?{urlencode(sorted(args.items(multi=True)))}'
+    return hashlib.sha1(representation.encode('utf-8')).hexdigest()
+
+def conditional_response(scope_func):
+    # Answer If-None-Match from the data version alone, before the view runs any list query
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            scope = scope_func(*args, **kwargs)
+            # Kept for cached_response, whose entries belong to one version so a body always matches its ETag
+            g.data_version = data_version(scope)
+            etag = compute_etag(scope, g.data_version, request.path, request.args)
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+# Response caching
+def request_cache_key(prefix, args=None, version=None):
+    # Query parameters are sorted so equivalent URLs share one entry. With a data version in the key, a body
+    # cached before a write (in any process) is never served under the newer ETag.
+    args = request.args if args is None else args
+    query = urlencode(sorted(args.items(multi=True)))
+    return prefix + query if version is None else f'{prefix}{version}:{query}'
+
+def cached_response(key_func):
+    # Serve a GET from the cache; key_func returns None for requests that must not be cached
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = key_func(*args, **kwargs)
+            if key is None:
+                return view(*args, **kwargs)
+            body = cache.get(key)
+            if body is not None:
+                return Response(body, mimetype='application/json')
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                cache.set(key, response.get_data())
+            return response
+        return wrapper
+    return decorator
+
+def all_campaigns_cache_key():
+    if request.args.get('format') == 'ndjson':
+        return None
+    return request_cache_key('campaigns:all:', version=g.data_version)
+
+def user_campaigns_cache_key(user_id):
+    if request.args.get('format') == 'ndjson':
+        return None
+    return request_cache_key(f'campaigns:user:{user_id}:', version=g.data_version)
+
+def stats_cache_key(user_id):
+    # Prefix of every stats entry of a user, dropped on writes
+    return f'stats:{user_id}:'
+
+def versioned_stats_cache_key(user_id, version):
+    return f'{stats_cache_key(user_id)}{version}:'
+
+def invalidate_campaign_cache(owner_ids):
+    # Called after a campaign write commits; the public list can change with any write
+    cache.delete_prefix('campaigns:all:')
+    for owner_id in owner_ids:
+        cache.delete_prefix(f'campaigns:user:{owner_id}:')
+        cache.delete_prefix(stats_cache_key(owner_id))
+
+# Campaign list serialization
+# Columns that can be requested through the `fields` query parameter
+CAMPAIGN_FIELDS = {
+    'id': Campaign.id,
+    'name': Campaign.name,
+    'description': Campaign.description,
+    'target_audience': Campaign.target_audience,
+    'platform': Campaign.platform,
+    'budget': Campaign.budget,
+    'start_date': Campaign.start_date,
+    'end_date': Campaign.end_date,
+    'status': Campaign.status,
+    'leads_count': Campaign.leads_count,
+    'responses_count': Campaign.responses_count,
+    'conversion_rate': Campaign.conversion_rate,
+    'message_template': Campaign.message_template,
+    'owner_id': Campaign.owner_id,
+    'owner_name': User.name,
+    'created_date': Campaign.created_date,
+    'tags': None  # Loaded per batch by serialize_campaign_rows
+}
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+
+def parse_fields(value):
+    if not value:
+        return list(CAMPAIGN_FIELDS)
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in CAMPAIGN_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+def parse_sort(args):
+    # sort=<field> or sort=-<field>; searches default to best match first
+    value = args.get('sort') or ('relevance' if args.get('q', '').strip() else 'id')
+    name = value.lstrip('-')
+    if name == 'relevance':
+        if not args.get('q', '').strip():
+            raise ValueError('sort=relevance needs a q search')
+    elif CAMPAIGN_FIELDS.get(name) is None:
+        raise ValueError(f'Cannot sort by {name}')
+    return name, value.startswith('-')
+
+def sort_expression(name):
+    return CAMPAIGN_SEARCH_RANK if name == 'relevance' else CAMPAIGN_FIELDS[name]
+
+def encode_cursor(sort, row):
+    # The default order keeps plain id cursors; other orders carry the sort value too
+    name, descending = sort
+    if sort == ('id', False):
+        return str(row.id)
+    position = json.dumps([name, descending, None if name == 'id' else row.sort_key, row.id])
+    return base64.urlsafe_b64encode(position.encode('utf-8')).decode('ascii')
+
+def is_cursor_value(value):
+    # A cursor is client input: only values that bind as one SQLite parameter may reach the query
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int):
+        return -2 ** 63 <= value < 2 ** 63
+    return value is None or isinstance(value, (float, str))
+
+def decode_cursor(sort, cursor):
+    # Returns the (sort value, id) to continue after
+    try:
+        if sort == ('id', False):
+            name, descending, value, campaign_id = 'id', False, None, int(cursor)
+        else:
+            name, descending, value, campaign_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not is_cursor_value(value) or not isinstance(campaign_id, int) or not is_cursor_value(campaign_id):
+        raise ValueError('Invalid cursor')
+    if [name, descending] != list(sort):
+        raise ValueError('cursor does not match the requested sort')
+    return value, campaign_id
+
+def parse_page_args(args, sort=('id', False)):
+    # Pagination is opt-in so existing clients keep receiving the full list
+    limit = args.get('limit')
+    cursor = args.get('cursor')
+    if limit is None and cursor is None:
+        return None, None
+    try:
+        limit = int(limit) if limit is not None else DEFAULT_PAGE_SIZE
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, MAX_PAGE_SIZE), decode_cursor(sort, cursor) if cursor else None
+
+def order_campaign_query(query, fields, sort, cursor):
+    # Orders by the sort value then id (nulls first ascending, last descending) and continues after the cursor
+    name, descending = sort
+    if name == 'id':
+        if cursor is not None:
+            query = query.where(Campaign.id < cursor[1] if descending else Campaign.id > cursor[1])
+        return query.order_by(Campaign.id.desc() if descending else Campaign.id)
+
+    expression = sort_expression(name)
+    if name == 'owner_name' and 'owner_name' not in fields:
+        query = query.join(User, Campaign.owner_id == User.id)
+    query = query.add_columns(expression.label('sort_key'))
+
+    if cursor is not None:
+        value, campaign_id = cursor
+        if descending and value is None:
+            query = query.where(expression.is_(None), Campaign.id < campaign_id)
+        elif descending:
+            query = query.where(db.or_(expression < value, db.and_(expression == value, Campaign.id < campaign_id), expression.is_(None)))
+        elif value is None:
+            query = query.where(db.or_(db.and_(expression.is_(None), Campaign.id > campaign_id), expression.is_not(None)))
+        else:
+            query = query.where(db.or_(expression > value, db.and_(expression == value, Campaign.id > campaign_id)))
+
+    if descending:
+        return query.order_by(expression.desc().nulls_last(), Campaign.id.desc())
+    return query.order_by(expression.asc().nulls_first(), Campaign.id)
+
+def campaign_columns(fields):
+    # Labels of the columns campaign_select returns, in order
+    return ['id'] + [field for field in fields if field != 'id' and CAMPAIGN_FIELDS[field] is not None]
+
+def campaign_select(fields):
+    # Only the requested columns are selected; the id is always needed for the cursor
+    columns = [CAMPAIGN_FIELDS[label].label(label) for label in campaign_columns(fields)]
+    query = db.select(*columns).select_from(Campaign)
+    if 'owner_name' in fields:
+        query = query.join(User, Campaign.owner_id == User.id)
+    return query
+
+@serialization_timer
+def campaign_rows_to_dicts(rows, fields, tags):
+    # Works on the row tuples by position; going through row._mapping per field was most of the list time
+    columns = campaign_columns(fields)
+    string_positions = [position for position, label in enumerate(columns) if label in ('id', 'owner_id')]
+    # Tags go at the end; rows may also carry a trailing sort_key column
+    positions = [-1 if field == 'tags' else columns.index(field) for field in fields]
+    with_tags = 'tags' in fields
+
+    campaigns = []
+    for row in rows:
+        values = list(row)
+        for position in string_positions:
+            values[position] = str(values[position])
+        if with_tags:
+            values.append(tags.get(row[0], []))
+        # Keys in the requested order, as the ndjson export writes them unsorted
+        campaigns.append(dict(zip(fields, [values[position] for position in positions])))
+    return campaigns
+
+def serialize_campaign_rows(rows, fields):
+    tags = load_campaign_tags([row.id for row in rows]) if 'tags' in fields else {}
+    return campaign_rows_to_dicts(rows, fields, tags)
+
+def campaign_page_response(query, fields, sort, limit, cursor):
+    query = order_campaign_query(query, fields, sort, cursor)
+
+    if request.args.get('format') == 'ndjson':
+        if limit is None:
+            return stream_campaigns_ndjson(query, fields)
+        # Headers go out before the body, so the cursor is read up front from the page's last two rows
+        response = stream_campaigns_ndjson(query.limit(limit), fields)
+        next_cursor = ndjson_next_cursor(sort, db.session.execute(next_cursor_query(query, limit)).all())
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
+
+    if limit is None:
+        campaigns = []
+        for rows in db.session.execute(query).partitions(STREAM_BATCH_SIZE):
+            campaigns += serialize_campaign_rows(rows, fields)
+        return jsonify({
+            'campaigns': campaigns
+        }), 200
+
+    # Fetch one extra row to know whether another page exists
+    rows = db.session.execute(query.limit(limit + 1)).all()
+    next_cursor = encode_cursor(sort, rows[limit - 1]) if len(rows) > limit else None
+    return jsonify({
+        'campaigns': serialize_campaign_rows(rows[:limit], fields),
+        'next_cursor': next_cursor
+    }), 200
+
+def next_cursor_query(query, limit):
+    # The last row of the page and the one after it, if any
+    return query.offset(limit - 1).limit(2)
+
+def ndjson_next_cursor(sort, rows):
+    return encode_cursor(sort, rows[0]) if len(rows) > 1 else None
+
+def iter_campaign_batches(query, fields, progress=None):
+    # Serialized campaigns in STREAM_BATCH_SIZE lists, read from a server-side cursor
+    result = db.session.execute(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+    done = 0
+    for rows in result.partitions():
+        yield serialize_campaign_rows(rows, fields)
+        done += len(rows)
+        if progress:
+            progress(done)
+
+def stream_campaigns_ndjson(query, fields):
+    return Response(stream_with_context(iter_campaigns_ndjson(query, fields)), mimetype='application/x-ndjson')
+
+def iter_campaigns_csv(query, fields, progress=None):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    # The header goes out before the query runs so the first byte is not held up
+    yield buffer.getvalue()
+    for campaigns in iter_campaign_batches(query, fields, progress):
+        buffer.seek(0)
+        buffer.truncate()
+        for campaign in campaigns:
+            writer.writerow([','.join(campaign[field]) if field == 'tags' else campaign[field] for field in fields])
+        yield buffer.getvalue()
+
+def iter_campaigns_ndjson(query, fields, progress=None):
+    for campaigns in iter_campaign_batches(query, fields, progress):
+        yield ''.join(json.dumps(campaign) + '\n' for campaign in campaigns)
+
+def gzip_chunks(chunks):
+    # Sync-flush after every chunk so compressed bytes reach the client as they are produced
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        yield compressor.compress(chunk.encode('utf-8')) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+def fetch_campaign_dict(campaign_id):
+    # Single-campaign responses go through the same joined select as the lists
+    fields = list(CAMPAIGN_FIELDS)
+    rows = db.session.execute(campaign_select(fields).where(Campaign.id == campaign_id)).all()
+    return serialize_campaign_rows(rows, fields)[0] if rows else None
+
+# Campaign statistics
+def campaign_stats_columns():
+    # Per-platform partial sums; build_campaign_stats folds them into the stats payload
+    is_live = Campaign.status.in_(['active', 'completed'])
+    has_leads = Campaign.leads_count > 0
+    return [
+        Campaign.platform.label('platform'),
+        db.func.count(Campaign.id).label('campaigns'),
+        db.func.sum(db.case((Campaign.status == 'active', 1), else_=0)).label('active'),
+        db.func.sum(db.case((Campaign.status == 'completed', 1), else_=0)).label('completed'),
+        db.func.sum(db.case((Campaign.status == 'draft', 1), else_=0)).label('draft'),
+        db.func.sum(db.case((is_live, Campaign.budget), else_=0)).label('budget'),
+        db.func.sum(db.func.coalesce(Campaign.leads_count, 0)).label('leads'),
+        db.func.sum(db.func.coalesce(Campaign.responses_count, 0)).label('conversions'),
+        db.func.sum(db.case((has_leads, db.func.coalesce(Campaign.conversion_rate, 0)), else_=0)).label('rate_sum'),
+        db.func.sum(db.case((has_leads, 1), else_=0)).label('rate_count')
+    ]
+
+def build_campaign_stats(rows):
+    stats = {
+        'active': 0,
+        'completed': 0,
+        'draft': 0,
+        'byPlatform': {},
+        'totalBudget': 0,
+        'totalLeads': 0,
+        'totalConversions': 0,
+        'averageConversionRate': 0
+    }
+    rate_sum = 0
+    rate_count = 0
+    for row in rows:
+        if not row.campaigns:
+            continue
+        stats['active'] += row.active
+        stats['completed'] += row.completed
+        stats['draft'] += row.draft
+        stats['byPlatform'][row.platform] = stats['byPlatform'].get(row.platform, 0) + row.campaigns
+        stats['totalBudget'] += row.budget
+        stats['totalLeads'] += row.leads
+        stats['totalConversions'] += row.conversions
+        rate_sum += row.rate_sum
+        rate_count += row.rate_count
+
+    if rate_count:
+        stats['averageConversionRate'] = rate_sum / rate_count
+    return stats
+
+def campaign_stats_entry(campaign):
+    # Python mirror of campaign_stats_columns() for a single campaign
+    leads = campaign.leads_count or 0
+    contribution = {
+        'campaigns': 1,
+        'active': int(campaign.status == 'active'),
+        'completed': int(campaign.status == 'completed'),
+        'draft': int(campaign.status == 'draft'),
+        'budget': campaign.budget if campaign.status in ['active', 'completed'] else 0,
+        'leads': leads,
+        'conversions': campaign.responses_count or 0,
+        'rate_sum': (campaign.conversion_rate or 0) if leads > 0 else 0,
+        'rate_count': int(leads > 0)
+    }
+    return (int(campaign.owner_id), campaign.platform), contribution
+
+def record_stats_change(before=None, after=None):
+    # Apply the difference between two campaign_stats_entry() results to the snapshot
+    deltas = {}
+    for entry, sign in ((before, -1), (after, 1)):
+        if entry is None:
+            continue
+        key, contribution = entry
+        delta = deltas.setdefault(key, dict.fromkeys(STATS_COUNTERS, 0))
+        for name, value in contribution.items():
+            delta[name] += sign * value
+
+    table = CampaignStatsSnapshot.__table__
+    for (owner_id, platform), delta in deltas.items():
+        if not any(delta.values()):
+            continue
+        stmt = dialect_insert(table).values(owner_id=owner_id, platform=platform, **delta)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.owner_id, table.c.platform],
+            set_={name: table.c[name] + stmt.excluded[name] for name in STATS_COUNTERS}
+        )
+        db.session.execute(stmt)
+
+# Leads/responses history (see timeseries.py)
+def metric_event(campaign_id, owner_id, platform, leads_delta, responses_delta):
+    return {
+        'campaign_id': int(campaign_id),
+        'owner_id': int(owner_id),
+        'platform': platform,
+        'leads_delta': leads_delta,
+        'responses_delta': responses_delta
+    }
+
+def record_metric_events(events):
+    # Append the non-zero deltas and add them to the rollups, in the caller's transaction
+    now = datetime.now()
+    events = [
+        dict(event, day=now.strftime('%Y-%m-%d'), recorded_at=now.strftime('%Y-%m-%d %H:%M:%S'))
+        for event in events if event['leads_delta'] or event['responses_delta']
+    ]
+    if not events:
+        return
+    db.session.execute(db.insert(CampaignMetricEvent), events)
+
+    table = CampaignMetricRollup.__table__
+    stmt = dialect_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.scope, table.c.scope_id, table.c.period, table.c.bucket],
+        set_={name: table.c[name] + stmt.excluded[name] for name in ('leads', 'responses', 'events')}
+    )
+    db.session.execute(stmt, rollup_rows(rollup_increments(events)))
+
+DEFAULT_TIMESERIES_DAYS = {'day': 30, 'week': 84}
+MAX_TIMESERIES_POINTS = 1000
+
+def parse_timeseries_args(args):
+    # Returns (period, bucket start dates); defaults to the last 30 days or 12 weeks
+    period = args.get('period', 'day')
+    if period not in PERIODS:
+        raise ValueError('period must be "day" or "week"')
+    try:
+        end = date.fromisoformat(args['to']) if args.get('to') else date.today()
+        start = date.fromisoformat(args['from']) if args.get('from') else end - timedelta(days=DEFAULT_TIMESERIES_DAYS[period] - 1)
+    except ValueError:
+        raise ValueError('from and to must be YYYY-MM-DD dates')
+    if start > end:
+        raise ValueError('from must not be after to')
+    buckets = series_buckets(start, end, period)
+    if len(buckets) > MAX_TIMESERIES_POINTS:
+        raise ValueError(f'At most {MAX_TIMESERIES_POINTS} points per request')
+    return period, buckets
+
+def timeseries_response(scope, scope_id):
+    try:
+        period, buckets = parse_timeseries_args(request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    rows = db.session.execute(
+        db.select(CampaignMetricRollup.bucket, CampaignMetricRollup.leads, CampaignMetricRollup.responses, CampaignMetricRollup.events)
+        .where(
+            CampaignMetricRollup.scope == scope,
+            CampaignMetricRollup.scope_id == str(scope_id),
+            CampaignMetricRollup.period == period,
+            CampaignMetricRollup.bucket.between(buckets[0], buckets[-1])
+        )
+    ).all()
+    return jsonify({
+        'period': period,
+        'from': buckets[0],
+        'to': buckets[-1],
+        'points': fill_series(rows, buckets)
+    }), 200
+
+@api.cli.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """Recompute the leads/responses rollups from the event log."""
+    count = rebuild_rollups(db.session.connection())
+    db.session.commit()
+    cache.clear()
+    print(f"Rebuilt {count} rollup rows")
+
+def rebuild_campaign_stats(owner_ids=None):
+    # Recompute the snapshot from the campaign table, for every owner or the given ones; the caller commits
+    delete = db.delete(CampaignStatsSnapshot)
+    query = db.select(Campaign.owner_id, *campaign_stats_columns()).group_by(Campaign.owner_id, Campaign.platform)
+    if owner_ids is not None:
+        owner_ids = list(owner_ids)
+        delete = delete.where(CampaignStatsSnapshot.owner_id.in_(owner_ids))
+        query = query.where(Campaign.owner_id.in_(owner_ids))
+
+    db.session.execute(delete)
+    rows = [dict(row._mapping) for row in db.session.execute(query)]
+    if rows:
+        db.session.execute(db.insert(CampaignStatsSnapshot), rows)
+    return len(rows)
+
+def rebuild_all_campaign_stats():
+    # Full rebuild for repairs; every user's data version moves so clients holding an ETag refetch
+    count = rebuild_campaign_stats()
+    bump_data_versions(db.session.scalars(db.select(User.id)).all())
+    db.session.commit()
+    cache.clear()
+    return count
+
+def check_campaign_stats():
+    # Return the ids of owners whose snapshot no longer matches their campaigns
+    expected = {}
+    for row in db.session.execute(db.select(Campaign.owner_id, *campaign_stats_columns()).group_by(Campaign.owner_id, Campaign.platform)):
+        expected.setdefault(row.owner_id, []).append(row)
+    actual = {}
+    for row in CampaignStatsSnapshot.query.all():
+        actual.setdefault(row.owner_id, []).append(row)
+
+    drifted = []
+    for owner_id in sorted(set(expected) | set(actual)):
+        want = build_campaign_stats(expected.get(owner_id, []))
+        have = build_campaign_stats(actual.get(owner_id, []))
+        for key, value in want.items():
+            if isinstance(value, float) or isinstance(have[key], float):
+                same = abs(value - have[key]) < 1e-6
+            else:
+                same = value == have[key]
+            if not same:
+                drifted.append(owner_id)
+                break
+    return drifted
+
+@api.cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """Rebuild the campaign stats snapshot from scratch."""
+    count = rebuild_all_campaign_stats()
+    print(f"Rebuilt {count} stats rows")
+
+@api.cli.command('check-stats')
+def check_stats_command():
+    """Compare the campaign stats snapshot with the campaign table."""
+    drifted = check_campaign_stats()
+    if drifted:
+        print(f"Stats drifted for users: {', '.join(str(owner_id) for owner_id in drifted)}")
+        raise SystemExit(1)
+    print("Stats snapshot is consistent")
+
+# Campaign change feed (see changefeed.py)
+def campaign_change(campaign_id, owner_id, action, public):
+    return {'campaign_id': campaign_id, 'owner_id': owner_id, 'action': action, 'public': public}
+
+def record_campaign_changes(changes):
+    # Append to the change log in the write's transaction and prune it to CHANGE_LOG_SIZE entries
+    if not changes:
+        return
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    db.session.execute(db.insert(CampaignChange), [dict(change, changed_at=now) for change in changes])
+    newest = db.select(db.func.max(CampaignChange.id)).scalar_subquery()
+    db.session.execute(db.delete(CampaignChange).where(CampaignChange.id <= newest - current_app.config['CHANGE_LOG_SIZE']))
+
+def change_log_query(after, until=None):
+    # Changes after `after` (up to `until`), oldest first
+    query = db.select(
+        CampaignChange.id, CampaignChange.campaign_id, CampaignChange.owner_id,
+        CampaignChange.action, CampaignChange.public, CampaignChange.changed_at
+    ).where(CampaignChange.id > after)
+    if until is not None:
+        query = query.where(CampaignChange.id <= until)
+    return query.order_by(CampaignChange.id)
+
+def change_feed_query(after, user_id=None, until=None):
+    # A user's feed has every change to their campaigns, the global feed only changes to public ones
+    if user_id is not None:
+        return change_log_query(after, until).where(CampaignChange.owner_id == user_id)
+    return change_log_query(after, until).where(CampaignChange.public.is_(True))
+
+def change_log_bounds_query():
+    return db.select(db.func.min(CampaignChange.id), db.func.max(CampaignChange.id))
+
+def change_matches(row, user_id):
+    # In-memory counterpart of change_feed_query's filter
+    return row.owner_id == user_id if user_id is not None else bool(row.public)
+
+def parse_change_feed_args(args, last_event_id):
+    # Returns (user id or None for the global feed, change id to resume after or None)
+    try:
+        user_id = int(args['user']) if args.get('user') else None
+        after = last_event_id or args.get('last_event_id')
+        after = int(after) if after else None
+    except ValueError:
+        raise ValueError('user and Last-Event-ID must be integers')
+    return user_id, after
+
+def change_feed_resumable(after, oldest, newest):
+    # False once changes after `after` have been pruned, or when it is past the newest change (a rebuilt database)
+    return after <= (newest or 0) and (oldest is None or after >= oldest - 1)
+
+def change_event(row):
+    return format_event({
+        'campaign_id': str(row.campaign_id),
+        'owner_id': str(row.owner_id),
+        'action': row.action,
+        'changed_at': row.changed_at
+    }, event_id=row.id)
+
+def change_feed_opening(after, oldest, newest, rows, retry):
+    # First messages of a stream: reconnect delay, the missed changes (or a reset when they are gone) and the position
+    newest = newest or 0
+    messages = [format_event(retry=retry)]
+    if after is not None and not change_feed_resumable(after, oldest, newest):
+        messages.append(format_event({'last_event_id': str(newest)}, event_id=newest, event='reset'))
+    else:
+        messages += [change_event(row) for row in rows]
+        messages.append(format_event(event_id=newest))
+    return ''.join(messages)
+
+# Bulk campaign import
+BULK_BATCH_SIZE = 1000
+CAMPAIGN_REQUIRED_FIELDS = ('name', 'description', 'target_audience', 'platform', 'budget', 'start_date', 'end_date', 'status')
+COUNT_FIELDS = ('leads_count', 'responses_count')
+
+def parse_count(value):
+    # (count, error) for leads_count/responses_count, shared by bulk import and batch PATCH; int() alone would
+    # truncate 3.7 and accept -5. Raises TypeError/ValueError when the value is not a number at all
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise TypeError('count must be a number')
+    if isinstance(value, str):
+        value = value.strip()
+        value = int(value) if value.lstrip('+-').isdigit() else float(value)
+    if isinstance(value, float):
+        if not value.is_integer():
+            return None, 'leads_count and responses_count must be whole numbers'
+        value = int(value)
+    if value < 0:
+        return None, 'leads_count and responses_count cannot be negative'
+    if value >= 2 ** 63:
+        return None, 'leads_count and responses_count are too large'
+    return value, None
+
+def parse_tags(tags):
+    # Tag names from a list or a comma-separated string; None and '' mean no tags
+    tags = tags or []
+    if isinstance(tags, str):
+        tags = tags.split(',')
+    if not isinstance(tags, list) or any(isinstance(tag, (dict, list)) for tag in tags):
+        raise ValueError('tags must be a list or a comma-separated string')
+    return [str(tag).strip() for tag in tags]
+
+def iter_bulk_rows(stream, content_type):
+    # Yield (row number, data, error) from a JSON array, NDJSON or CSV body
+    if content_type == 'application/json':
+        try:
+            rows = json.load(stream)
+        except ValueError:
+            raise ValueError('Request body is not valid JSON')
+        if not isinstance(rows, list):
+            raise ValueError('Expected a JSON array of campaigns')
+        for number, row in enumerate(rows, 1):
+            yield number, row, None
+    elif content_type in ('application/x-ndjson', 'application/ndjson'):
+        number = 0
+        for line in io.TextIOWrapper(stream, encoding='utf-8'):
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                yield number, json.loads(line), None
+            except ValueError:
+                yield number, None, 'Invalid JSON'
+    elif content_type == 'text/csv':
+        reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8', newline=''))
+        for number, row in enumerate(reader, 1):
+            yield number, {key: value for key, value in row.items() if value not in (None, '')}, None
+    else:
+        raise ValueError('Unsupported content type, use application/json, application/x-ndjson or text/csv')
+
+def validate_campaign_row(data):
+    # Return (values, tags, error); CSV values arrive as strings and are coerced here
+    if not isinstance(data, dict):
+        return None, None, 'Expected an object'
+    missing = [field for field in CAMPAIGN_REQUIRED_FIELDS if data.get(field) in (None, '')]
+    if missing:
+        return None, None, f"Missing required fields: {', '.join(missing)}"
+    try:
+        values = {
+            'name': str(data['name']),
+            'description': str(data['description']),
+            'target_audience': str(data['target_audience']),
+            'platform': str(data['platform']),
+            'budget': float(data['budget']),
+            'start_date': str(data['start_date']),
+            'end_date': str(data['end_date']),
+            'status': str(data['status']),
+            'leads_count': data.get('leads_count') or 0,
+            'responses_count': data.get('responses_count') or 0,
+            'message_template': str(data.get('message_template') or '')
         }
+        counts = [parse_count(values[name]) for name in COUNT_FIELDS]
+        if data.get('id') not in (None, ''):
+            values['id'] = int(data['id'])
+    except (TypeError, ValueError):
+        return None, None, 'budget, leads_count, responses_count and id must be numbers'
+    for name, (count, error) in zip(COUNT_FIELDS, counts):
+        if error:
+            return None, None, error
+        values[name] = count
+    if 'id' in values and not 0 < values['id'] < 2 ** 63:
+        return None, None, 'id must be a positive campaign id'
+
+    # None leaves an upserted campaign's tags as they are
+    if 'tags' not in data:
+        return values, None, None
+    try:
+        return values, parse_tags(data['tags']), None
+    except ValueError as e:
+        return None, None, str(e)
+
+def insert_campaigns(rows):
+    # Multi-row INSERT .. RETURNING, ids in the order of rows; Campaign._sentinel keeps it from going row by row.
+    # The rows share one set of keys. A Core insert keeps a None conversion_rate as NULL, whereas the ORM bulk
+    # insert leaves None values out and starts a new statement at every row whose keys differ from the last
+    table = Campaign.__table__
+    return db.session.scalars(table.insert().returning(table.c.id, sort_by_parameter_order=True), rows).all()
+
+def sync_campaign_id_sequence():
+    # Rows inserted with their own id do not move PostgreSQL's sequence; SQLite's AUTOINCREMENT follows max(id) by itself
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(db.text("SELECT setval(pg_get_serial_sequence('campaign', 'id'), (SELECT max(id) FROM campaign))"))
+
+def import_campaign_batch(batch, user, mode, today):
+    # Insert/upsert one validated batch; returns (inserted, updated, errors, touched owner ids)
+    errors = []
+    new_rows = [entry for entry in batch if 'id' not in entry[1]]
+    id_rows = [entry for entry in batch if 'id' in entry[1]]
+
+    if id_rows and mode != 'upsert':
+        errors += [(number, 'id is only accepted with mode=upsert') for number, _, _ in id_rows]
+        id_rows = []
+    # An id repeated in the batch is applied once, as its last row (with the latest tags given), so its
+    # stats and metric deltas are not counted twice
+    last_rows = {}
+    for number, values, tags in id_rows:
+        previous = last_rows.pop(values['id'], None)
+        last_rows[values['id']] = (number, values, previous[2] if tags is None and previous else tags)
+    id_rows = list(last_rows.values())
+
+    current = {}
+    update_rows = []
+    keyed_rows = []
+    if id_rows:
+        current = {row.id: row for row in db.session.execute(
+            db.select(Campaign.id, Campaign.owner_id, Campaign.status, Campaign.leads_count, Campaign.responses_count)
+            .where(Campaign.id.in_([values['id'] for _, values, _ in id_rows]))
+        )}
+        for number, values, tags in id_rows:
+            if values['id'] not in current:
+                # Ids that do not exist (yet, or any more) are inserted under that id
+                keyed_rows.append((number, values, tags))
+            elif current[values['id']].owner_id != user.id and user.role != 'admin':
+                errors.append((number, 'Unauthorized'))
+            else:
+                update_rows.append((number, values, tags))
+
+    for _, values, _ in new_rows + keyed_rows + update_rows:
+        leads = values['leads_count']
+        values['conversion_rate'] = (values['responses_count'] / leads) * 100 if leads > 0 else None
+
+    tags_by_campaign = {}
+    events = []
+    changes = []
+    # insert_campaigns needs one set of keys per call, so rows with and without an id go separately
+    for rows in (new_rows, keyed_rows):
+        if not rows:
+            continue
+        ids = insert_campaigns([dict(values, owner_id=user.id, created_date=today) for _, values, _ in rows])
+        tags_by_campaign.update((campaign_id, tags) for campaign_id, (_, _, tags) in zip(ids, rows) if tags is not None)
+        events += [
+            metric_event(campaign_id, user.id, values['platform'], values['leads_count'], values['responses_count'])
+            for campaign_id, (_, values, _) in zip(ids, rows)
+        ]
+        changes += [
+            campaign_change(campaign_id, user.id, 'created', values['status'] != 'draft')
+            for campaign_id, (_, values, _) in zip(ids, rows)
+        ]
+    if keyed_rows:
+        sync_campaign_id_sequence()
+    if update_rows:
+        db.session.execute(db.update(Campaign), [values for _, values, _ in update_rows])
+        tags_by_campaign.update((values['id'], tags) for _, values, tags in update_rows if tags is not None)
+        for _, values, _ in update_rows:
+            row = current[values['id']]
+            events.append(metric_event(
+                row.id, row.owner_id, values['platform'],
+                values['leads_count'] - (row.leads_count or 0), values['responses_count'] - (row.responses_count or 0)
+            ))
+            changes.append(campaign_change(row.id, row.owner_id, 'updated', row.status != 'draft' or values['status'] != 'draft'))
+    if tags_by_campaign:
+        set_tags_for_campaigns(tags_by_campaign)
+    record_metric_events(events)
+    record_campaign_changes(changes)
+
+    # Owners touched by this batch get their stats rebuilt rather than patched row by row
+    owner_ids = {user.id} | {current[values['id']].owner_id for _, values, _ in update_rows}
+    rebuild_campaign_stats(owner_ids)
+    bump_data_versions(owner_ids)
+    return len(new_rows) + len(keyed_rows), len(update_rows), errors, owner_ids
+
+def import_campaigns(rows, user, mode='insert', progress=None):
+    # Validate and load rows in BULK_BATCH_SIZE chunks, committing each chunk on its own; progress gets the last row number done
+    today = datetime.now().strftime('%Y-%m-%d')
+    summary = {'inserted': 0, 'updated': 0, 'errors': []}
+
+    def flush(batch):
+        try:
+            inserted, updated, errors, owner_ids = import_campaign_batch(batch, user, mode, today)
+            db.session.commit()
+            invalidate_campaign_cache(owner_ids)
+            change_notifier.notify()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            inserted, updated = 0, 0
+            errors = [(number, f'Batch failed: {e.__class__.__name__}') for number, _, _ in batch]
+        summary['inserted'] += inserted
+        summary['updated'] += updated
+        summary['errors'] += [{'row': number, 'message': message} for number, message in errors]
+
+    batch = []
+    number = 0
+    for number, data, error in rows:
+        values, tags, error = (None, None, error) if error else validate_campaign_row(data)
+        if error:
+            summary['errors'].append({'row': number, 'message': error})
+            continue
+        batch.append((number, values, tags))
+        if len(batch) >= BULK_BATCH_SIZE:
+            flush(batch)
+            batch = []
+            if progress:
+                progress(number)
+    if batch:
+        flush(batch)
+    if progress:
+        progress(number)
+
+    summary['errors'].sort(key=lambda error: error['row'])
+    return summary
+
+# Batch campaign changes
+BATCH_FILTER_KEYS = ('tags', 'match', 'status', 'platform', 'q', 'owner') + tuple(RANGE_FILTERS)
+CAMPAIGN_CHANGE_TYPES = {
+    'name': str,
+    'description': str,
+    'target_audience': str,
+    'platform': str,
+    'budget': float,
+    'start_date': str,
+    'end_date': str,
+    'status': str,
+    'leads_count': int,
+    'responses_count': int,
+    'message_template': str
+}
+
+def parse_campaign_changes(changes):
+    # Return (column values, tags or None) for a batch update
+    if not isinstance(changes, dict) or not changes:
+        raise ValueError('changes must be a non-empty object')
+    unknown = sorted(name for name in changes if name not in CAMPAIGN_CHANGE_TYPES and name != 'tags')
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    values = {}
+    for name, value in changes.items():
+        if name == 'tags':
+            continue
+        if value is None:
+            raise ValueError(f'{name} cannot be null')
+        try:
+            if name in COUNT_FIELDS:
+                values[name], error = parse_count(value)
+            else:
+                values[name], error = CAMPAIGN_CHANGE_TYPES[name](value), None
+        except (TypeError, ValueError):
+            raise ValueError(f'{name} must be a number')
+        if error:
+            raise ValueError(error)
+
+    tags = parse_tags(changes['tags']) if 'tags' in changes else None
+    return values, tags
+
+def select_batch_campaigns(data, user):
+    # Resolve `ids` or `filter` in one query; returns (ids in response order, {id: rejection}, rows the user may change)
+    if not isinstance(data, dict) or ('ids' in data) == ('filter' in data):
+        raise ValueError('Pass either ids or filter')
+    columns = (Campaign.id, Campaign.owner_id, Campaign.platform, Campaign.status, Campaign.leads_count, Campaign.responses_count)
+
+    if 'ids' in data:
+        if not isinstance(data['ids'], list) or not data['ids']:
+            raise ValueError('ids must be a non-empty list')
+        if len(data['ids']) > BULK_BATCH_SIZE:
+            raise ValueError(f'At most {BULK_BATCH_SIZE} ids per request, use filter for larger sets')
+        try:
+            ids = list(dict.fromkeys(int(campaign_id) for campaign_id in data['ids']))
+        except (TypeError, ValueError):
+            raise ValueError('ids must be campaign ids')
+
+        found = {row.id: row for row in db.session.execute(db.select(*columns).where(Campaign.id.in_(ids)))}
+        rejected = {}
+        for campaign_id in ids:
+            if campaign_id not in found:
+                rejected[campaign_id] = 'not_found'
+            elif found[campaign_id].owner_id != user.id and user.role != 'admin':
+                rejected[campaign_id] = 'unauthorized'
+        return ids, rejected, [found[campaign_id] for campaign_id in ids if campaign_id not in rejected]
+
+    filters = data['filter']
+    if not isinstance(filters, dict) or not filters:
+        raise ValueError('filter must be a non-empty object')
+    unknown = sorted(name for name in filters if name not in BATCH_FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown filters: {', '.join(unknown)}")
+    # Same parameters as the list endpoints; lists are accepted for the comma-separated ones
+    args = {name: ','.join(map(str, value)) if isinstance(value, list) else str(value) for name, value in filters.items()}
+    query = apply_campaign_filters(db.select(*columns), args, db.engine.dialect.name).order_by(Campaign.id)
+
+    # Admins can target everything (or one owner); other users only their own campaigns
+    owner_id = args.get('owner') if user.role == 'admin' else user.id
+    if owner_id:
+        query = query.where(Campaign.owner_id == owner_id)
+    rows = db.session.execute(query).all()
+    return [row.id for row in rows], {}, rows
+
+def update_campaign_rows(rows, values, tags):
+    # Set-based UPDATE in chunks of BULK_BATCH_SIZE ids; the caller commits
+    ids = [row.id for row in rows]
+    if values:
+        # SET expressions see the old row, so the rate is computed from the new counts where they change
+        leads = db.literal(values['leads_count']) if 'leads_count' in values else db.func.coalesce(Campaign.leads_count, 0)
+        responses = db.literal(values['responses_count']) if 'responses_count' in values else db.func.coalesce(Campaign.responses_count, 0)
+        conversion_rate = db.case((leads > 0, db.cast(responses, db.Float) / leads * 100), else_=Campaign.conversion_rate)
+        for start in range(0, len(ids), BULK_BATCH_SIZE):
+            stmt = db.update(Campaign).where(Campaign.id.in_(ids[start:start + BULK_BATCH_SIZE]))
+            db.session.execute(
+                stmt.values(**values, conversion_rate=conversion_rate).execution_options(synchronize_session=False)
+            )
+    if tags is not None:
+        set_tags_for_campaigns(dict.fromkeys(ids, tags))
+    record_campaign_changes([
+        campaign_change(row.id, row.owner_id, 'updated', row.status != 'draft' or values.get('status', row.status) != 'draft')
+        for row in rows
+    ])
+
+    if 'leads_count' in values or 'responses_count' in values:
+        record_metric_events([
+            metric_event(
+                row.id, row.owner_id, values.get('platform', row.platform),
+                values.get('leads_count', row.leads_count or 0) - (row.leads_count or 0),
+                values.get('responses_count', row.responses_count or 0) - (row.responses_count or 0)
+            )
+            for row in rows
+        ])
+
+def delete_campaign_rows(rows):
+    ids = [row.id for row in rows]
+    for start in range(0, len(ids), BULK_BATCH_SIZE):
+        chunk = ids[start:start + BULK_BATCH_SIZE]
+        db.session.execute(db.delete(campaign_tags).where(campaign_tags.c.campaign_id.in_(chunk)))
+        db.session.execute(db.delete(Campaign).where(Campaign.id.in_(chunk)).execution_options(synchronize_session=False))
+    record_campaign_changes([campaign_change(row.id, row.owner_id, 'deleted', row.status != 'draft') for row in rows])
+
+def commit_campaign_batch(rows):
+    # Stats, data versions and cache entries of every owner touched by a batch change
+    owner_ids = sorted({row.owner_id for row in rows})
+    rebuild_campaign_stats(owner_ids)
+    bump_data_versions(owner_ids)
+    db.session.commit()
+    invalidate_campaign_cache(owner_ids)
+    change_notifier.notify()
+
+def batch_results(ids, rejected, status):
+    return [{'id': str(campaign_id), 'status': rejected.get(campaign_id, status)} for campaign_id in ids]
+
+# Background tasks (see tasks.py)
+TASK_HANDLERS = {}
+BULK_CONTENT_TYPES = ('application/json', 'application/x-ndjson', 'application/ndjson', 'text/csv')
+EXPORT_MIMETYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+def task_handler(kind):
+    # Handlers take (task, params, progress) and return (JSON-able result, result file path or None)
+    def decorator(func):
+        TASK_HANDLERS[kind] = func
+        return func
+    return decorator
+
+def task_timestamp(offset=0):
+    return (datetime.now() + timedelta(seconds=offset)).strftime('%Y-%m-%d %H:%M:%S')
+
+def task_result_dir():
+    # Every file a task owns is named <task id>.<something> in here
+    path = current_app.config['TASK_RESULT_DIR'] or os.path.join(current_app.instance_path, 'task_results')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def async_requested():
+    return request.args.get('async') == '1'
+
+def queue_task(kind, owner_id, params, task_id=None):
+    now = task_timestamp()
+    task = Task(id=task_id or uuid.uuid4().hex, kind=kind, owner_id=owner_id, status='queued', params=json.dumps(params), created_at=now, updated_at=now)
+    db.session.add(task)
+    db.session.commit()
+    task_workers.start()
+    task_workers.wake()
+    return task
+
+def task_accepted(task):
+    response = jsonify({'message': 'Task queued', 'task': task.to_dict()})
+    response.headers['Location'] = f'/api/tasks/{task.id}'
+    return response, 202
+
+def write_task_progress(task_id, done, total=None):
+    # Own short transaction, so pollers see it while the task's session is mid-work; best effort
+    values = {'progress': done, 'updated_at': task_timestamp()}
+    if total is not None:
+        values['total'] = total
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(db.update(Task).where(Task.id == task_id).values(**values))
+    except SQLAlchemyError:
+        pass
+
+def claim_task():
+    # Oldest queued task; the conditional UPDATE makes sure only one worker gets it
+    while True:
+        task_id = db.session.scalar(
+            db.select(Task.id).where(Task.status == 'queued').order_by(Task.created_at, Task.id).limit(1)
+        )
+        if task_id is None:
+            return None
+        now = task_timestamp()
+        claimed = db.session.execute(
+            db.update(Task).where(Task.id == task_id, Task.status == 'queued')
+            .values(status='running', started_at=now, updated_at=now)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return db.session.get(Task, task_id)
+
+def run_next_task(app):
+    # Run one queued task in its own app context; returns False when the queue is empty
+    with app.app_context():
+        task = claim_task()
+        if task is None:
+            return False
+        task_id, kind = task.id, task.kind
+        progress = Progress(lambda done: write_task_progress(task_id, done))
+        started = time.perf_counter()
+        try:
+            result, result_file = TASK_HANDLERS[kind](task, json.loads(task.params), progress)
+            values = {'status': 'done', 'result': json.dumps(result), 'result_file': result_file, 'progress': progress.done}
+        except ValueError as e:
+            # Bad input, reported to the user as is
+            db.session.rollback()
+            values = {'status': 'failed', 'error': str(e)}
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.exception('Task %s (%s) failed', task_id, kind)
+            values = {'status': 'failed', 'error': f'Task failed: {e.__class__.__name__}'}
+
+        now = task_timestamp()
+        db.session.execute(
+            db.update(Task).where(Task.id == task_id)
+            .values(**values, updated_at=now, finished_at=now, expires_at=task_timestamp(current_app.config['TASK_RESULT_TTL']))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        task_duration.observe(time.perf_counter() - started, kind, values['status'])
+        return True
+
+def expire_tasks(app):
+    # Delete tasks past their retention along with their files, and fail running tasks that stopped reporting
+    with app.app_context():
+        now = task_timestamp()
+        expired = db.session.scalars(db.select(Task.id).where(Task.expires_at < now)).all()
+        if expired:
+            directory = task_result_dir()
+            for task_id in expired:
+                for path in glob.glob(os.path.join(directory, task_id + '.*')):
+                    os.remove(path)
+            db.session.execute(db.delete(Task).where(Task.id.in_(expired)))
+
+        stale_before = task_timestamp(-current_app.config['TASK_STALE_AFTER'])
+        db.session.execute(
+            db.update(Task).where(Task.status == 'running', Task.updated_at < stale_before)
+            .values(status='failed', error='Task stopped reporting progress', updated_at=now, finished_at=now,
+                    expires_at=task_timestamp(current_app.config['TASK_RESULT_TTL']))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+def task_workers_for(app, threads):
+    return TaskWorkers(
+        lambda: run_next_task(app),
+        lambda: expire_tasks(app),
+        threads=threads,
+        poll_interval=app.config['TASK_POLL_INTERVAL']
+    )
+
+@task_handler('rebuild-stats')
+def rebuild_stats_task(task, params, progress):
+    return {'rows': rebuild_all_campaign_stats()}, None
+
+@task_handler('export')
+def export_task(task, params, progress):
+    fields = params['fields']
+    query = apply_campaign_filters(campaign_select(fields), MultiDict(params['args']), db.engine.dialect.name).order_by(Campaign.id)
+    if params['owner_id']:
+        query = query.where(Campaign.owner_id == params['owner_id'])
+    write_task_progress(task.id, 0, db.session.scalar(db.select(db.func.count()).select_from(query.subquery())))
+
+    iter_chunks = iter_campaigns_csv if params['format'] == 'csv' else iter_campaigns_ndjson
+    path = os.path.join(task_result_dir(), f"{task.id}.{params['format']}")
+    try:
+        with open(path + '.part', 'w', encoding='utf-8', newline='') as f:
+            for chunk in iter_chunks(query, fields, progress):
+                f.write(chunk)
+        os.replace(path + '.part', path)
+    finally:
+        if os.path.exists(path + '.part'):
+            os.remove(path + '.part')
+    return {'rows': progress.done, 'format': params['format']}, path
+
+@task_handler('bulk-import')
+def bulk_import_task(task, params, progress):
+    user = db.session.get(User, task.owner_id)
+    try:
+        if not user:
+            raise ValueError('User not found')
+        with open(params['upload'], 'rb') as stream:
+            return import_campaigns(iter_bulk_rows(stream, params['content_type']), user, params['mode'], progress), None
+    finally:
+        os.remove(params['upload'])
+
+@api.cli.command('worker')
+@click.option('--threads', default=2, show_default=True, help='Tasks run at the same time.')
+def worker_command(threads):
+    """Run queued background tasks until interrupted."""
+    print(f"Running background tasks ({threads} threads)")
+    task_workers_for(current_app._get_current_object(), threads).run()
+
+# Query shapes that must be answered through an index, checked by `flask check-indexes`
+def hot_campaign_queries(dialect):
+    fields = list(CAMPAIGN_FIELDS)
+    user_campaigns = campaign_select(fields).where(Campaign.owner_id == 1)
+    return {
+        'user campaigns': order_campaign_query(user_campaigns, fields, ('id', False), None),
+        'user campaigns page': order_campaign_query(user_campaigns, fields, ('id', False), (None, 100)).limit(100),
+        'user campaigns by status': db.select(Campaign.id).where(Campaign.owner_id == 1, Campaign.status == 'active'),
+        'campaigns by status and date': db.select(Campaign.id).where(Campaign.status == 'active', Campaign.created_date >= '2024-01-01'),
+        'campaigns by platform': db.select(Campaign.id).where(Campaign.platform == 'Email'),
+        'campaigns by tag': tagged_campaign_ids(['B2B', 'Tech'], 'all'),
+        'campaign search': apply_campaign_filters(db.select(Campaign.id), {'q': 'launch'}, dialect),
+        'campaign tags': db.select(campaign_tags.c.tag_id).where(campaign_tags.c.campaign_id.in_([1, 2])),
+        'user stats': db.select(CampaignStatsSnapshot).where(CampaignStatsSnapshot.owner_id == 1),
+        'user timeseries': db.select(CampaignMetricRollup).where(
+            CampaignMetricRollup.scope == 'user', CampaignMetricRollup.scope_id == '1',
+            CampaignMetricRollup.period == 'day', CampaignMetricRollup.bucket.between('2024-01-01', '2024-01-31')
+        )
+    }
+
+def check_hot_queries(conn):
+    # Returns {name: (plan, problems)}; a problem is a full table scan or a sort that an index should have avoided
+    results = {}
+    for name, query in hot_campaign_queries(conn.dialect.name).items():
+        plan = explain_query_plan(conn, query)
+        problems = [scan for table in ('campaign', 'campaign_stats_snapshot', 'campaign_tags', 'tag') for scan in full_table_scans(plan, table)]
+        results[name] = (plan, problems + temp_sorts(plan))
+    return results
+
+@api.cli.command('migrate')
+def migrate_command():
+    """Create missing tables and apply pending schema migrations."""
+    applied = run_migrations(db)
+    for version, description in applied:
+        print(f"Applied migration {version}: {description}")
+    print("Database is up to date")
+
+@api.cli.command('check-indexes')
+def check_indexes_command():
+    """Fail if a hot campaign query falls back to a full table scan or a temporary sort."""
+    failed = False
+    with db.engine.connect() as conn:
+        for name, (plan, problems) in check_hot_queries(conn).items():
+            print(f"{'FAIL' if problems else 'ok  '} {name}: {'; '.join(plan)}")
+            failed = failed or bool(problems)
+    if failed:
+        raise SystemExit(1)
+
+# Request metrics and profiling
+def profiling_requested():
+    return request.args.get('profile') == '1' or request.headers.get('X-Profile') == '1'
+
+def is_admin_request():
+    try:
+        verify_jwt_in_request(optional=True)
+    except (JWTExtendedException, PyJWTError):
+        return False
+    user_id = get_jwt_identity()
+    user = db.session.get(User, user_id) if user_id is not None else None
+    return user is not None and user.role == 'admin'
+
+def profile_response(profiler, response):
+    # Replaces the response with a cProfile breakdown plus the request's SQL and serialization totals
+    stats = g.request_stats
+    out = io.StringIO()
+    out.write(f'{request.method} {request.full_path} -> {response.status_code} in {(time.perf_counter() - g.request_started) * 1000:.1f} ms\n')
+    out.write(f'SQL: {stats.queries} statements, {stats.query_seconds * 1000:.1f} ms\n')
+    out.write(f'Serialization: {stats.serialization_seconds * 1000:.1f} ms\n\n')
+    pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(current_app.config['PROFILE_TOP_FUNCTIONS'])
+    return Response(out.getvalue(), mimetype='text/plain')
+
+@api.before_app_request
+def start_request_metrics():
+    g.request_stats = RequestStats()
+    g.request_started = time.perf_counter()
+    # ?profile=1 or X-Profile: 1 profiles this one request; admins only
+    if profiling_requested():
+        if not is_admin_request():
+            return jsonify({'message': 'Unauthorized'}), 403
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+@api.after_app_request
+def finish_request_metrics(response):
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        # Drain streamed bodies so the profile covers producing them
+        response.get_data()
+        profiler.disable()
+        response = profile_response(profiler, response)
+
+    stats = g.request_stats
+    started = g.request_started
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    method = request.method
+    status = str(response.status_code)
+
+    def record():
+        request_latency.observe(time.perf_counter() - started, method, route, status)
+        request_queries.observe(stats.queries, route)
+        request_query_time.observe(stats.query_seconds, route)
+        request_serialization_time.observe(stats.serialization_seconds, route)
+
+    # Streamed bodies are produced after this hook, so they are recorded once the server closes the response
+    if response.is_streamed:
+        response.call_on_close(record)
+    else:
+        record()
+    return response
+
+@api.before_app_request
+def start_task_workers():
+    # Started on the first request rather than in create_app(), so every forked worker gets its own threads
+    task_workers.start()
+
+# Authentication helpers
+def auth_retry_after(ip, email=None):
+    # Checked before any hashing so abusive clients never reach the hash pool
+    retry_after = ip_throttle.hit(ip)
+    if email:
+        retry_after = max(retry_after, email_throttle.hit(email.lower()))
+    return retry_after
+
+def throttle_auth_attempt(email=None):
+    retry_after = auth_retry_after(request.remote_addr, email)
+    if retry_after:
+        response = jsonify({'message': 'Too many attempts, try again later'})
+        response.headers['Retry-After'] = str(retry_after)
+        return response, 429
+    return None
+
+def hash_pool_busy():
+    response = jsonify({'message': 'Server busy, try again shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
 
 # Authentication routes
-@app.route('/api/auth/register', methods=['POST'])
+@api.route('/api/auth/register', methods=['POST'])
 def register():
     data = request.get_json()
     
     if not all(k in data for k in ('name', 'email', 'password')):
         return jsonify({'message': 'Missing required fields'}), 400
+
+    throttled = throttle_auth_attempt()
+    if throttled:
+        return throttled
         
     # Check if user already exists
     if User.query.filter_by(email=data['email']).first():
         return jsonify({'message': 'User already exists'}), 409
         
     # Create new user
-    hashed_password = generate_password_hash(data['password'])
+    try:
+        hashed_password = hasher.hash(data['password'])
+    except HashPoolBusy:
+        return hash_pool_busy()
     new_user = User(
         name=data['name'],
         email=data['email'],
@@ -109,19 +1757,32 @@ def register():
         'access_token': access_token
     }), 201
 
-@app.route('/api/auth/login', methods=['POST'])
+@api.route('/api/auth/login', methods=['POST'])
 def login():
     data = request.get_json()
     
     if not all(k in data for k in ('email', 'password')):
         return jsonify({'message': 'Missing email or password'}), 400
+
+    throttled = throttle_auth_attempt(data['email'])
+    if throttled:
+        return throttled
         
     # Find user by email
     user = User.query.filter_by(email=data['email']).first()
     
     # Check if user exists and password is correct
-    if not user or not check_password_hash(user.password, data['password']):
-        return jsonify({'message': 'Invalid email or password'}), 401
+    try:
+        if not user or not hasher.verify(user.password, data['password']):
+            return jsonify({'message': 'Invalid email or password'}), 401
+
+        # Upgrade hashes made with an older method or cost while we have the plain password
+        if hasher.needs_rehash(user.password):
+            user.password = hasher.hash(data['password'])
+            db.session.commit()
+    except HashPoolBusy:
+        return hash_pool_busy()
+    email_throttle.reset(data['email'].lower())
         
     # Create access token
     access_token = create_access_token(identity=user.id)
@@ -132,12 +1793,12 @@ def login():
         'access_token': access_token
     }), 200
 
-@app.route('/api/auth/logout', methods=['POST'])
+@api.route('/api/auth/logout', methods=['POST'])
 def logout():
     # In a stateless JWT setup, logout is handled client-side by removing the token
     return jsonify({'message': 'Logged out successfully'}), 200
 
-@app.route('/api/auth/me', methods=['GET'])
+@api.route('/api/auth/me', methods=['GET'])
 @jwt_required()
 def get_current_user():
     user_id = get_jwt_identity()
@@ -150,61 +1811,212 @@ def get_current_user():
         'user': user.to_dict()
     }), 200
 
-# Campaign routes
-@app.route('/api/campaigns', methods=['GET'])
-def get_all_campaigns():
-    # Only get active and completed campaigns for public view
-    campaigns = Campaign.query.filter(Campaign.status != 'draft').all()
+# Metrics routes
+@api.route('/metrics', methods=['GET'])
+def get_metrics():
+    token = current_app.config['METRICS_TOKEN']
+    if token and not hmac.compare_digest(request.headers.get('X-Metrics-Token', ''), token):
+        return jsonify({'message': 'Unauthorized'}), 403
+
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# Cache routes
+@api.route('/api/cache/stats', methods=['GET'])
+@jwt_required()
+def get_cache_stats():
+    user = User.query.get(get_jwt_identity())
+    if not user or user.role != 'admin':
+        return jsonify({'message': 'Unauthorized'}), 403
+
     return jsonify({
-        'campaigns': [campaign.to_dict() for campaign in campaigns]
+        'cache': cache.stats()
     }), 200
 
-@app.route('/api/campaigns/user/<user_id>', methods=['GET'])
+# Task routes
+def load_task(task_id):
+    # Tasks are visible to the user who queued them and to admins, until they expire
+    user = User.query.get(get_jwt_identity())
+    task = db.session.get(Task, task_id)
+    if not task or not user or (task.owner_id != user.id and user.role != 'admin'):
+        return None
+    if task.expires_at and task.expires_at < task_timestamp():
+        return None
+    return task
+
+@api.route('/api/tasks', methods=['GET'])
+@jwt_required()
+def get_tasks():
+    tasks = Task.query.filter_by(owner_id=get_jwt_identity()).order_by(Task.created_at.desc()).limit(100).all()
+    return jsonify({'tasks': [task.to_dict() for task in tasks]}), 200
+
+@api.route('/api/tasks/<task_id>', methods=['GET'])
+@jwt_required()
+def get_task(task_id):
+    task = load_task(task_id)
+    if not task:
+        return jsonify({'message': 'Task not found'}), 404
+
+    return jsonify({'task': task.to_dict()}), 200
+
+@api.route('/api/tasks/<task_id>/result', methods=['GET'])
+@jwt_required()
+def get_task_result(task_id):
+    task = load_task(task_id)
+    if not task:
+        return jsonify({'message': 'Task not found'}), 404
+    if task.status != 'done':
+        return jsonify({'message': f'Task is {task.status}'}), 409
+
+    result = json.loads(task.result) if task.result else None
+    if task.result_file:
+        if not os.path.exists(task.result_file):
+            return jsonify({'message': 'Task result not found'}), 404
+        export_format = result['format']
+        return send_file(task.result_file, mimetype=EXPORT_MIMETYPES[export_format], as_attachment=True, download_name=f'campaigns.{export_format}')
+    return jsonify({'result': result}), 200
+
+# Campaign routes
+@api.route('/api/campaigns', methods=['GET'])
+@conditional_response(lambda: 'global')
+@cached_response(all_campaigns_cache_key)
+def get_all_campaigns():
+    try:
+        fields = parse_fields(request.args.get('fields'))
+        sort = parse_sort(request.args)
+        limit, cursor = parse_page_args(request.args, sort)
+        # Only get active and completed campaigns for public view
+        query = campaign_select(fields).where(Campaign.status != 'draft')
+        query = apply_campaign_filters(query, request.args, db.engine.dialect.name)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    return campaign_page_response(query, fields, sort, limit, cursor)
+
+@api.route('/api/campaigns/export', methods=['GET'])
+@jwt_required()
+def export_campaigns():
+    user = User.query.get(get_jwt_identity())
+    if not user:
+        return jsonify({'message': 'User not found'}), 404
+
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'ndjson'):
+        return jsonify({'message': 'format must be "csv" or "ndjson"'}), 400
+
+    try:
+        fields = parse_fields(request.args.get('fields'))
+        query = apply_campaign_filters(campaign_select(fields), request.args, db.engine.dialect.name).order_by(Campaign.id)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    # Admins can export everything (or one owner); other users only their own campaigns
+    owner_id = request.args.get('owner') if user.role == 'admin' else user.id
+    if async_requested():
+        # async=1 writes the file in the background; fetch it from the task's result_url
+        params = {'format': export_format, 'fields': fields, 'args': request.args.to_dict(flat=False), 'owner_id': owner_id}
+        return task_accepted(queue_task('export', user.id, params))
+    if owner_id:
+        query = query.where(Campaign.owner_id == owner_id)
+
+    if export_format == 'csv':
+        chunks, mimetype = iter_campaigns_csv(query, fields), 'text/csv'
+    else:
+        chunks, mimetype = iter_campaigns_ndjson(query, fields), 'application/x-ndjson'
+
+    headers = {'Content-Disposition': f'attachment; filename=campaigns.{export_format}', 'Vary': 'Accept-Encoding'}
+    if 'gzip' in request.accept_encodings:
+        chunks = gzip_chunks(chunks)
+        headers['Content-Encoding'] = 'gzip'
+
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
+
+@api.route('/api/campaigns/user/<int:user_id>', methods=['GET'])
+@conditional_response(lambda user_id: f'user:{user_id}')
+@cached_response(user_campaigns_cache_key)
 def get_user_campaigns(user_id):
-    campaigns = Campaign.query.filter_by(owner_id=user_id).all()
+    try:
+        fields = parse_fields(request.args.get('fields'))
+        sort = parse_sort(request.args)
+        limit, cursor = parse_page_args(request.args, sort)
+        query = campaign_select(fields).where(Campaign.owner_id == user_id)
+        query = apply_campaign_filters(query, request.args, db.engine.dialect.name)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    return campaign_page_response(query, fields, sort, limit, cursor)
+
+@api.route('/api/campaigns/stats/<int:user_id>', methods=['GET'])
+@conditional_response(lambda user_id: f'user:{user_id}')
+@cached_response(lambda user_id: versioned_stats_cache_key(user_id, g.data_version))
+def get_campaign_stats(user_id):
+    rows = CampaignStatsSnapshot.query.filter_by(owner_id=user_id).all()
     return jsonify({
-        'campaigns': [campaign.to_dict() for campaign in campaigns]
+        'stats': build_campaign_stats(rows)
     }), 200
 
-@app.route('/api/campaigns/stats/<user_id>', methods=['GET'])
-def get_campaign_stats(user_id):
-    user_campaigns = Campaign.query.filter_by(owner_id=user_id).all()
-    
-    # Count by status
-    active = sum(1 for campaign in user_campaigns if campaign.status == 'active')
-    completed = sum(1 for campaign in user_campaigns if campaign.status == 'completed')
-    draft = sum(1 for campaign in user_campaigns if campaign.status == 'draft')
-    
-    # Count by platform
-    by_platform = {}
-    for campaign in user_campaigns:
-        by_platform[campaign.platform] = by_platform.get(campaign.platform, 0) + 1
-    
-    # Calculate total budget
-    total_budget = sum(campaign.budget for campaign in user_campaigns if campaign.status in ['active', 'completed'])
-    
-    # Calculate total leads and conversions
-    total_leads = sum(campaign.leads_count for campaign in user_campaigns)
-    total_conversions = sum(campaign.responses_count for campaign in user_campaigns)
-    
-    # Calculate average conversion rate
-    campaigns_with_leads = [c for c in user_campaigns if c.leads_count > 0]
-    avg_conversion_rate = sum(c.conversion_rate or 0 for c in campaigns_with_leads) / len(campaigns_with_leads) if campaigns_with_leads else 0
-    
+@api.route('/api/campaigns/stats', methods=['GET'])
+@jwt_required()
+def get_all_campaign_stats():
+    user = User.query.get(get_jwt_identity())
+    if not user or user.role != 'admin':
+        return jsonify({'message': 'Unauthorized'}), 403
+
+    rows = CampaignStatsSnapshot.query.order_by(CampaignStatsSnapshot.owner_id)
+    rows_by_owner = {}
+    for row in rows:
+        rows_by_owner.setdefault(str(row.owner_id), []).append(row)
+
     return jsonify({
-        'stats': {
-            'active': active,
-            'completed': completed,
-            'draft': draft,
-            'byPlatform': by_platform,
-            'totalBudget': total_budget,
-            'totalLeads': total_leads,
-            'totalConversions': total_conversions,
-            'averageConversionRate': avg_conversion_rate
-        }
+        'stats': {owner_id: build_campaign_stats(owner_rows) for owner_id, owner_rows in rows_by_owner.items()}
     }), 200
 
-@app.route('/api/campaigns', methods=['POST'])
+@api.route('/api/campaigns/stats/rebuild', methods=['POST'])
+@jwt_required()
+def rebuild_campaign_stats_task():
+    user = User.query.get(get_jwt_identity())
+    if not user or user.role != 'admin':
+        return jsonify({'message': 'Unauthorized'}), 403
+
+    return task_accepted(queue_task('rebuild-stats', user.id, {}))
+
+@api.route('/api/campaigns/changes', methods=['GET'])
+def get_campaign_changes():
+    # Without the ASGI server a long-lived stream would hold a worker thread, so this answers with the pending
+    # changes and closes; EventSource reconnects after `retry` with Last-Event-ID, which makes it a cheap poll
+    try:
+        user_id, after = parse_change_feed_args(request.args, request.headers.get('Last-Event-ID'))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    oldest, newest = db.session.execute(change_log_bounds_query()).one()
+    rows = []
+    if after is not None and change_feed_resumable(after, oldest, newest):
+        rows = db.session.execute(change_feed_query(after, user_id, newest)).all()
+    body = change_feed_opening(after, oldest, newest, rows, current_app.config['CHANGES_RETRY'])
+    return Response(body, mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@api.route('/api/campaigns/<campaign_id>/timeseries', methods=['GET'])
+def get_campaign_timeseries(campaign_id):
+    if not db.session.scalar(db.select(Campaign.id).where(Campaign.id == campaign_id)):
+        return jsonify({'message': 'Campaign not found'}), 404
+    return timeseries_response('campaign', campaign_id)
+
+# No ETag here: the default range moves with the date even when the data does not
+@api.route('/api/campaigns/stats/<int:user_id>/timeseries', methods=['GET'])
+@cached_response(lambda user_id: request_cache_key(stats_cache_key(user_id) + 'timeseries:'))
+def get_user_timeseries(user_id):
+    return timeseries_response('user', user_id)
+
+@api.route('/api/campaigns/platforms/<platform>/timeseries', methods=['GET'])
+@jwt_required()
+def get_platform_timeseries(platform):
+    # Platform totals cover every user's campaigns
+    user = User.query.get(get_jwt_identity())
+    if not user or user.role != 'admin':
+        return jsonify({'message': 'Unauthorized'}), 403
+    return timeseries_response('platform', platform)
+
+@api.route('/api/campaigns', methods=['POST'])
 @jwt_required()
 def create_campaign():
     user_id = get_jwt_identity()
@@ -217,9 +2029,6 @@ def create_campaign():
     if data.get('leads_count', 0) > 0:
         conversion_rate = (data.get('responses_count', 0) / data.get('leads_count', 0)) * 100
     
-    # Process tags
-    tags_str = ','.join(data.get('tags', [])) if data.get('tags') else ''
-    
     new_campaign = Campaign(
         name=data['name'],
         description=data['description'],
@@ -234,19 +2043,60 @@ def create_campaign():
         conversion_rate=conversion_rate,
         message_template=data.get('message_template', ''),
         owner_id=user_id,
-        created_date=today,
-        tags=tags_str
+        created_date=today
     )
     
     db.session.add(new_campaign)
+    db.session.flush()
+    set_campaign_tags(new_campaign.id, data.get('tags'))
+    owner_id = new_campaign.owner_id
+    record_stats_change(after=campaign_stats_entry(new_campaign))
+    record_metric_events([metric_event(new_campaign.id, owner_id, new_campaign.platform, new_campaign.leads_count or 0, new_campaign.responses_count or 0)])
+    record_campaign_changes([campaign_change(new_campaign.id, owner_id, 'created', new_campaign.status != 'draft')])
+    bump_data_versions([owner_id])
     db.session.commit()
+    invalidate_campaign_cache([owner_id])
+    change_notifier.notify()
     
     return jsonify({
         'message': 'Campaign created successfully',
-        'campaign': new_campaign.to_dict()
+        'campaign': fetch_campaign_dict(new_campaign.id)
     }), 201
 
-@app.route('/api/campaigns/<campaign_id>', methods=['PUT'])
+@api.route('/api/campaigns/bulk', methods=['POST'])
+@jwt_required()
+def bulk_import_campaigns():
+    user = User.query.get(get_jwt_identity())
+    if not user:
+        return jsonify({'message': 'User not found'}), 404
+
+    mode = request.args.get('mode', 'insert')
+    if mode not in ('insert', 'upsert'):
+        return jsonify({'message': 'mode must be "insert" or "upsert"'}), 400
+
+    if async_requested():
+        # async=1 spools the body to disk and imports it in the background
+        if request.mimetype not in BULK_CONTENT_TYPES:
+            return jsonify({'message': 'Unsupported content type, use application/json, application/x-ndjson or text/csv'}), 400
+        task_id = uuid.uuid4().hex
+        upload = os.path.join(task_result_dir(), f'{task_id}.upload')
+        with open(upload, 'wb') as f:
+            shutil.copyfileobj(request.stream, f)
+        params = {'mode': mode, 'content_type': request.mimetype, 'upload': upload}
+        return task_accepted(queue_task('bulk-import', user.id, params, task_id))
+
+    try:
+        summary = import_campaigns(iter_bulk_rows(request.stream, request.mimetype), user, mode)
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 400
+
+    return jsonify({
+        'message': 'Bulk import finished',
+        **summary
+    }), 200
+
+@api.route('/api/campaigns/<campaign_id>', methods=['PUT'])
 @jwt_required()
 def update_campaign(campaign_id):
     user_id = get_jwt_identity()
@@ -261,6 +2111,9 @@ def update_campaign(campaign_id):
         return jsonify({'message': 'Unauthorized'}), 403
         
     data = request.get_json()
+    before = campaign_stats_entry(campaign)
+    leads_before, responses_before = campaign.leads_count or 0, campaign.responses_count or 0
+    public_before = campaign.status != 'draft'
     
     # Update fields if provided
     if 'name' in data:
@@ -286,20 +2139,30 @@ def update_campaign(campaign_id):
     if 'message_template' in data:
         campaign.message_template = data['message_template']
     if 'tags' in data:
-        campaign.tags = ','.join(data['tags'])
+        set_campaign_tags(campaign.id, data['tags'])
     
     # Recalculate conversion rate
     if campaign.leads_count > 0:
         campaign.conversion_rate = (campaign.responses_count / campaign.leads_count) * 100
     
+    owner_id = campaign.owner_id
+    record_stats_change(before, campaign_stats_entry(campaign))
+    record_metric_events([metric_event(
+        campaign.id, owner_id, campaign.platform,
+        (campaign.leads_count or 0) - leads_before, (campaign.responses_count or 0) - responses_before
+    )])
+    record_campaign_changes([campaign_change(campaign.id, owner_id, 'updated', public_before or campaign.status != 'draft')])
+    bump_data_versions([owner_id])
     db.session.commit()
+    invalidate_campaign_cache([owner_id])
+    change_notifier.notify()
     
     return jsonify({
         'message': 'Campaign updated successfully',
-        'campaign': campaign.to_dict()
+        'campaign': fetch_campaign_dict(campaign.id)
     }), 200
 
-@app.route('/api/campaigns/<campaign_id>', methods=['DELETE'])
+@api.route('/api/campaigns/<campaign_id>', methods=['DELETE'])
 @jwt_required()
 def delete_campaign(campaign_id):
     user_id = get_jwt_identity()
@@ -313,29 +2176,145 @@ def delete_campaign(campaign_id):
     if str(campaign.owner_id) != str(user_id) and user.role != 'admin':
         return jsonify({'message': 'Unauthorized'}), 403
         
+    owner_id = campaign.owner_id
+    record_stats_change(before=campaign_stats_entry(campaign))
+    db.session.execute(db.delete(campaign_tags).where(campaign_tags.c.campaign_id == campaign.id))
+    record_campaign_changes([campaign_change(campaign.id, owner_id, 'deleted', campaign.status != 'draft')])
     db.session.delete(campaign)
+    bump_data_versions([owner_id])
     db.session.commit()
+    invalidate_campaign_cache([owner_id])
+    change_notifier.notify()
     
     return jsonify({
         'message': 'Campaign deleted successfully'
     }), 200
 
-# Initialize the database
-with app.app_context():
-    db.create_all()
-    
+@api.route('/api/campaigns', methods=['PATCH'])
+@jwt_required()
+def update_campaigns():
+    user = User.query.get(get_jwt_identity())
+    if not user:
+        return jsonify({'message': 'User not found'}), 404
+
+    data = request.get_json(silent=True)
+    try:
+        values, tags = parse_campaign_changes(data.get('changes') if isinstance(data, dict) else None)
+        ids, rejected, rows = select_batch_campaigns(data, user)
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 400
+
+    # Every change lands in one transaction
+    if rows:
+        update_campaign_rows(rows, values, tags)
+        commit_campaign_batch(rows)
+
+    return jsonify({
+        'message': 'Campaigns updated successfully',
+        'updated': len(rows),
+        'results': batch_results(ids, rejected, 'updated')
+    }), 200
+
+@api.route('/api/campaigns', methods=['DELETE'])
+@jwt_required()
+def delete_campaigns():
+    user = User.query.get(get_jwt_identity())
+    if not user:
+        return jsonify({'message': 'User not found'}), 404
+
+    try:
+        ids, rejected, rows = select_batch_campaigns(request.get_json(silent=True), user)
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 400
+
+    if rows:
+        delete_campaign_rows(rows)
+        commit_campaign_batch(rows)
+
+    return jsonify({
+        'message': 'Campaigns deleted successfully',
+        'deleted': len(rows),
+        'results': batch_results(ids, rejected, 'deleted')
+    }), 200
+
+# Application factory
+def create_app(config=None):
+    app = Flask(__name__)
+    load_config(app)
+    if config:
+        app.config.update(config)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(
+        app.config['SQLALCHEMY_DATABASE_URI'],
+        app.config['DB_PROFILE'],
+        pool_size=app.config['DB_POOL_SIZE'],
+        max_overflow=app.config['DB_MAX_OVERFLOW']
+    )
+
+    CORS(app, supports_credentials=True, expose_headers=['X-Next-Cursor'])
+    app.json = TimedJSONProvider(app)
+    jwt.init_app(app)
+    db.init_app(app)
+    app.extensions['response_cache'] = create_cache(app.config)
+    # The hash pool starts its processes on first use, so forked workers each get their own
+    app.extensions['password_hasher'] = PasswordHasher(
+        method=app.config['PASSWORD_HASH_METHOD'],
+        workers=app.config['HASH_WORKERS'],
+        queue_limit=app.config['HASH_QUEUE_LIMIT'],
+        timeout=app.config['HASH_TIMEOUT']
+    )
+    app.extensions['email_throttle'] = AttemptThrottle(limit=app.config['AUTH_EMAIL_ATTEMPT_LIMIT'], window=app.config['AUTH_ATTEMPT_WINDOW'])
+    app.extensions['ip_throttle'] = AttemptThrottle(limit=app.config['AUTH_IP_ATTEMPT_LIMIT'], window=app.config['AUTH_ATTEMPT_WINDOW'])
+    app.extensions['task_workers'] = task_workers_for(app, app.config['TASK_WORKERS'])
+    app.extensions['change_notifier'] = ChangeNotifier()
+    app.register_blueprint(api)
+
+    # Engines connect lazily; this only registers the connection hooks
+    with app.app_context():
+        apply_sqlite_pragmas(db.engine, app.config['DB_PROFILE'])
+        instrument_engine(db.engine)
+    return app
+
+def init_database():
+    # Schema, admin account and one-off backfills; run once per deployment (`flask init`), never at import
+    applied = run_migrations(db)
+
     # Check if admin user exists, if not create one
     admin = User.query.filter_by(email='admin@example.com').first()
     if not admin:
         admin_user = User(
             name='Administrator',
             email='admin@example.com',
-            password=generate_password_hash('admin'),
+            password=generate_password_hash('admin', current_app.config['PASSWORD_HASH_METHOD']),
             role='admin'
         )
         db.session.add(admin_user)
         db.session.commit()
 
+    # Databases created before the stats snapshot existed need a one-off backfill
+    if not CampaignStatsSnapshot.query.first() and Campaign.query.first():
+        rebuild_all_campaign_stats()
+
+    # Close the connections opened here so workers forked after an init in the master start with an empty pool
+    # (an in-memory database lives in its one connection, so that one is kept)
+    db.session.remove()
+    if not is_memory_sqlite(current_app.config['SQLALCHEMY_DATABASE_URI']):
+        db.engine.dispose()
+    return applied
+
+@api.cli.command('init')
+def init_command():
+    """Create or migrate the schema and seed the admin account."""
+    for version, description in init_database():
+        print(f"Applied migration {version}: {description}")
+    print("Database initialized")
+
+# Default app for `flask --app app`, asgi.py and the scripts; importing it does not touch the database
+app = create_app()
+
 # Start the application
 if __name__ == '__main__':
+    with app.app_context():
+        init_database()
     app.run(debug=True)
@@ -0,0 +1,411 @@
+"""ASGI entry point for the campaign API.
+
+The read-heavy campaign routes and the auth routes are served by async handlers
+on an async SQLAlchemy engine (aiosqlite for SQLite). Every other route is passed
+through to the existing Flask app, so both entry points answer the same URLs
+with the same payloads. The campaign change feed is only a long-lived stream
+here: one poller per process fans changes out to every open connection, so
+idle clients do not hold threads. Run with:
+
+    uvicorn asgi:app --workers 4
+"""
+from contextlib import asynccontextmanager
+import asyncio
+import json
+import re
+import time
+
+from a2wsgi import WSGIMiddleware
+from flask_jwt_extended import create_access_token, decode_token
+from jwt import ExpiredSignatureError, InvalidTokenError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Mount, Route
+from werkzeug.datastructures import MultiDict
+from werkzeug.http import parse_etags
+
+import app as wsgi
+from app import Campaign, CampaignStatsSnapshot, User, db
+from changefeed import ChangeHub, format_heartbeat
+from engine_profile import apply_sqlite_pragmas, engine_options, is_memory_sqlite
+
+# Async drivers for the sync URLs the Flask app is configured with
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg'
+}
+
+def create_engine_for(flask_app):
+    with flask_app.app_context():
+        url = db.engine.url
+    url = url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+    options = engine_options(str(url), flask_app.config['DB_PROFILE'])
+    if options.get('pool_size') and not is_memory_sqlite(str(url)):
+        options['poolclass'] = AsyncAdaptedQueuePool
+    engine = create_async_engine(url, **options)
+    apply_sqlite_pragmas(engine.sync_engine, flask_app.config['DB_PROFILE'])
+    return engine
+
+engine = create_engine_for(wsgi.app)
+Session = async_sessionmaker(engine, expire_on_commit=False)
+
+# The Flask app's services; async handlers run outside its app context, so they are used directly
+cache = wsgi.app.extensions['response_cache']
+hasher = wsgi.app.extensions['password_hasher']
+email_throttle = wsgi.app.extensions['email_throttle']
+change_notifier = wsgi.app.extensions['change_notifier']
+
+# Responses
+def json_response(payload, status_code=200, headers=None):
+    # Same body bytes as Flask's jsonify so cached entries are shared between both apps
+    body = wsgi.app.json.dumps(payload, separators=(',', ':')) + '\n'
+    return Response(body, status_code=status_code, headers=headers, media_type='application/json')
+
+def request_args(request):
+    return MultiDict(request.query_params.multi_items())
+
+async def with_etag(request, session, scope, build):
+    # Async counterpart of conditional_response: 304 straight from the data version, which build() also keys its cache entry by
+    args = request_args(request)
+    version = (await session.scalar(wsgi.data_version_query(scope))) or 0
+    etag = wsgi.compute_etag(scope, version, request.url.path, args)
+    if parse_etags(request.headers.get('if-none-match')).contains(etag):
+        response = Response(status_code=304)
+    else:
+        response = await build(args, version)
+        if response.status_code != 200 or isinstance(response, StreamingResponse):
+            return response
+    response.headers['ETag'] = f'"{etag}"'
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+async def cached(key, build):
+    if key is None:
+        return await build()
+    body = cache.get(key)
+    if body is not None:
+        return Response(body, media_type='application/json')
+    response = await build()
+    if response.status_code == 200:
+        cache.set(key, response.body)
+    return response
+
+# Campaign serialization
+async def serialize_rows(session, rows, fields):
+    tags = {}
+    if 'tags' in fields and rows:
+        tags = wsgi.group_campaign_tags(await session.execute(wsgi.campaign_tags_query([row.id for row in rows])))
+    return wsgi.campaign_rows_to_dicts(rows, fields, tags)
+
+async def campaign_page(session, args, query, fields, sort, limit, cursor):
+    query = wsgi.order_campaign_query(query, fields, sort, cursor)
+
+    if args.get('format') == 'ndjson':
+        if limit is None:
+            return StreamingResponse(stream_ndjson(query, fields), media_type='application/x-ndjson')
+        response = StreamingResponse(stream_ndjson(query.limit(limit), fields), media_type='application/x-ndjson')
+        next_cursor = wsgi.ndjson_next_cursor(sort, (await session.execute(wsgi.next_cursor_query(query, limit))).all())
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
+
+    if limit is None:
+        campaigns = []
+        result = await session.stream(query)
+        async for rows in result.partitions(wsgi.STREAM_BATCH_SIZE):
+            campaigns += await serialize_rows(session, rows, fields)
+        return json_response({'campaigns': campaigns})
+
+    rows = (await session.execute(query.limit(limit + 1))).all()
+    next_cursor = wsgi.encode_cursor(sort, rows[limit - 1]) if len(rows) > limit else None
+    return json_response({
+        'campaigns': await serialize_rows(session, rows[:limit], fields),
+        'next_cursor': next_cursor
+    })
+
+async def stream_ndjson(query, fields):
+    # Streams outlive the request handler, so they use a session of their own
+    async with Session() as session:
+        result = await session.stream(query.execution_options(yield_per=wsgi.STREAM_BATCH_SIZE))
+        async for rows in result.partitions():
+            campaigns = await serialize_rows(session, rows, fields)
+            yield ''.join(json.dumps(campaign) + '\n' for campaign in campaigns)
+
+async def list_campaigns(request, scope, cache_prefix, base_query):
+    async with Session() as session:
+        async def build(args, version):
+            try:
+                fields = wsgi.parse_fields(args.get('fields'))
+                sort = wsgi.parse_sort(args)
+                limit, cursor = wsgi.parse_page_args(args, sort)
+                query = wsgi.apply_campaign_filters(base_query(fields), args, engine.dialect.name)
+            except ValueError as e:
+                return json_response({'message': str(e)}, 400)
+
+            key = None if args.get('format') == 'ndjson' else wsgi.request_cache_key(cache_prefix, args, version)
+            return await cached(key, lambda: campaign_page(session, args, query, fields, sort, limit, cursor))
+
+        return await with_etag(request, session, scope, build)
+
+# Campaign routes
+async def get_all_campaigns(request):
+    # Only get active and completed campaigns for public view
+    return await list_campaigns(
+        request, 'global', 'campaigns:all:',
+        lambda fields: wsgi.campaign_select(fields).where(Campaign.status != 'draft')
+    )
+
+async def get_user_campaigns(request):
+    user_id = request.path_params['user_id']
+    return await list_campaigns(
+        request, f'user:{user_id}', f'campaigns:user:{user_id}:',
+        lambda fields: wsgi.campaign_select(fields).where(Campaign.owner_id == user_id)
+    )
+
+async def get_campaign_stats(request):
+    user_id = request.path_params['user_id']
+    async with Session() as session:
+        async def build(args, version):
+            async def load():
+                rows = (await session.scalars(db.select(CampaignStatsSnapshot).where(CampaignStatsSnapshot.owner_id == user_id))).all()
+                return json_response({'stats': wsgi.build_campaign_stats(rows)})
+            return await cached(wsgi.versioned_stats_cache_key(user_id, version), load)
+
+        return await with_etag(request, session, f'user:{user_id}', build)
+
+# Change feed
+async def fetch_changes(after):
+    async with Session() as session:
+        # Rows first: a prune committed in between then shows up as lost changes instead of going unnoticed
+        rows = (await session.execute(wsgi.change_log_query(after))).all()
+        return (await session.execute(wsgi.change_log_bounds_query())).one()[0], rows
+
+async def newest_change():
+    async with Session() as session:
+        return (await session.execute(wsgi.change_log_bounds_query())).one()[1]
+
+changes_hub = ChangeHub(
+    fetch_changes,
+    newest_change,
+    change_notifier,
+    poll_interval=wsgi.app.config['CHANGES_POLL_INTERVAL'],
+    queue_size=wsgi.app.config['CHANGES_QUEUE_SIZE']
+)
+
+async def get_campaign_changes(request):
+    try:
+        user_id, after = wsgi.parse_change_feed_args(request_args(request), request.headers.get('last-event-id'))
+    except ValueError as e:
+        return json_response({'message': str(e)}, 400)
+    return StreamingResponse(
+        stream_changes(user_id, after),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+async def stream_changes(user_id, after):
+    # Subscribe before reading the log so nothing committed in between is missed; ids already sent are skipped
+    subscription = changes_hub.subscribe(lambda row: wsgi.change_matches(row, user_id))
+    try:
+        if after is None and changes_hub.position is not None:
+            # A new client starts at the hub's position, so a reconnect storm of fresh clients costs no queries
+            oldest, newest, rows = None, changes_hub.position, []
+        else:
+            async with Session() as session:
+                oldest, newest = (await session.execute(wsgi.change_log_bounds_query())).one()
+                rows = []
+                if after is not None and wsgi.change_feed_resumable(after, oldest, newest):
+                    rows = (await session.execute(wsgi.change_feed_query(after, user_id, newest))).all()
+        yield wsgi.change_feed_opening(after, oldest, newest, rows, wsgi.app.config['CHANGES_RETRY'])
+        last_id = newest or 0
+
+        while True:
+            try:
+                await asyncio.wait_for(subscription.ready.wait(), wsgi.app.config['CHANGES_HEARTBEAT'])
+            except asyncio.TimeoutError:
+                yield format_heartbeat()
+                continue
+            subscription.ready.clear()
+            if subscription.overflowed:
+                # Too far behind to catch up from memory; closing makes the client reconnect and resume from the log,
+                # or get a reset when the changes it missed were pruned
+                return
+            messages = []
+            while subscription.pending:
+                row = subscription.pending.popleft()
+                if row.id > last_id:
+                    messages.append(wsgi.change_event(row))
+                    last_id = row.id
+            if messages:
+                yield ''.join(messages)
+    finally:
+        changes_hub.unsubscribe(subscription)
+
+# Authentication helpers
+def throttled_response(request, email=None):
+    with wsgi.app.app_context():
+        retry_after = wsgi.auth_retry_after(request.client.host if request.client else None, email)
+    if retry_after:
+        return json_response({'message': 'Too many attempts, try again later'}, 429, {'Retry-After': str(retry_after)})
+    return None
+
+def busy_response():
+    return json_response({'message': 'Server busy, try again shortly'}, 503, {'Retry-After': '1'})
+
+def access_token_for(user):
+    with wsgi.app.app_context():
+        return create_access_token(identity=user.id)
+
+def jwt_identity(request):
+    # Mirrors flask_jwt_extended's status codes and messages for the common failures
+    header = request.headers.get('authorization', '')
+    if not header:
+        return None, json_response({'msg': 'Missing Authorization Header'}, 401)
+    parts = header.split()
+    if len(parts) != 2 or parts[0] != 'Bearer':
+        return None, json_response({'msg': "Bad Authorization header. Expected 'Authorization: Bearer <JWT>'"}, 422)
+    try:
+        with wsgi.app.app_context():
+            token = decode_token(parts[1])
+    except ExpiredSignatureError:
+        return None, json_response({'msg': 'Token has expired'}, 401)
+    except InvalidTokenError as e:
+        return None, json_response({'msg': str(e)}, 422)
+    return token[wsgi.app.config.get('JWT_IDENTITY_CLAIM', 'sub')], None
+
+async def read_json(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+# Authentication routes
+async def register(request):
+    data = await read_json(request)
+    if not isinstance(data, dict) or not all(k in data for k in ('name', 'email', 'password')):
+        return json_response({'message': 'Missing required fields'}, 400)
+
+    throttled = throttled_response(request)
+    if throttled:
+        return throttled
+
+    async with Session() as session:
+        if await session.scalar(db.select(User.id).where(User.email == data['email'])):
+            return json_response({'message': 'User already exists'}, 409)
+
+        try:
+            hashed_password = await asyncio.to_thread(hasher.hash, data['password'])
+        except wsgi.HashPoolBusy:
+            return busy_response()
+        new_user = User(name=data['name'], email=data['email'], password=hashed_password, role='user')
+        session.add(new_user)
+        await session.commit()
+
+        return json_response({
+            'message': 'User registered successfully',
+            'user': new_user.to_dict(),
+            'access_token': access_token_for(new_user)
+        }, 201)
+
+async def login(request):
+    data = await read_json(request)
+    if not isinstance(data, dict) or not all(k in data for k in ('email', 'password')):
+        return json_response({'message': 'Missing email or password'}, 400)
+
+    throttled = throttled_response(request, data['email'])
+    if throttled:
+        return throttled
+
+    async with Session() as session:
+        user = await session.scalar(db.select(User).where(User.email == data['email']).limit(1))
+        try:
+            if not user or not await asyncio.to_thread(hasher.verify, user.password, data['password']):
+                return json_response({'message': 'Invalid email or password'}, 401)
+
+            if hasher.needs_rehash(user.password):
+                user.password = await asyncio.to_thread(hasher.hash, data['password'])
+                await session.commit()
+        except wsgi.HashPoolBusy:
+            return busy_response()
+        email_throttle.reset(data['email'].lower())
+
+        return json_response({
+            'message': 'Login successful',
+            'user': user.to_dict(),
+            'access_token': access_token_for(user)
+        })
+
+async def get_current_user(request):
+    user_id, error = jwt_identity(request)
+    if error:
+        return error
+
+    async with Session() as session:
+        user = await session.get(User, user_id)
+        if not user:
+            return json_response({'message': 'User not found'}, 404)
+        return json_response({'user': user.to_dict()})
+
+class RequestMetricsMiddleware:
+    # Latency of the async routes under the same series as the Flask hooks; passed-through requests are recorded by Flask
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status = ['500']
+        async def send_with_status(message):
+            if message['type'] == 'http.response.start':
+                status[0] = str(message['status'])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = ROUTE_LABELS.get(scope.get('endpoint'))
+            if route:
+                wsgi.request_latency.observe(time.perf_counter() - started, scope['method'], route, status[0])
+
+@asynccontextmanager
+async def lifespan(app):
+    await changes_hub.start()
+    yield
+    await changes_hub.stop()
+    await engine.dispose()
+
+async_routes = [
+    Route('/api/auth/register', register, methods=['POST']),
+    Route('/api/auth/login', login, methods=['POST']),
+    Route('/api/auth/me', get_current_user, methods=['GET']),
+    Route('/api/campaigns', get_all_campaigns, methods=['GET']),
+    Route('/api/campaigns/user/{user_id:int}', get_user_campaigns, methods=['GET']),
+    Route('/api/campaigns/stats/{user_id:int}', get_campaign_stats, methods=['GET']),
+    Route('/api/campaigns/changes', get_campaign_changes, methods=['GET'])
+]
+
+# Metric labels use the Flask rule syntax ({user_id:int} is <int:user_id>) so both entry points share series;
+# streams that stay open for hours would drown the latency histogram, so the change feed is left out
+ROUTE_LABELS = {
+    route.endpoint: re.sub(r'\{(\w+)(?::(\w+))?\}', lambda match: f"<{match[2] + ':' if match[2] else ''}{match[1]}>", route.path)
+    for route in async_routes if route.endpoint is not get_campaign_changes
+}
+
+app = Starlette(
+    routes=async_routes + [
+        # Writes, exports, admin, cache and metrics routes keep running on the Flask app
+        Mount('/', WSGIMiddleware(wsgi.app))
+    ],
+    middleware=[
+        # Same policy as flask_cors on the WSGI app: any origin, with credentials
+        Middleware(CORSMiddleware, allow_origin_regex='.*', allow_credentials=True, allow_methods=['*'], allow_headers=['*'], expose_headers=['X-Next-Cursor']),
+        Middleware(RequestMetricsMiddleware)
+    ],
+    lifespan=lifespan
+)
@@ -0,0 +1,59 @@
+"""Compare two benchmark reports written by benchmarks.suite.
+
+Prints the p50 change for every route and dataset size, and exits non-zero when
+any route got slower than the threshold or issues more queries per request:
+
+    python -m benchmarks.compare before.json after.json --threshold 0.2
+"""
+import argparse
+import json
+import sys
+
+def index_results(report):
+    return {(result['users'], result['campaigns_per_user']): result['routes'] for result in report['results']}
+
+def compare(before, after, threshold, min_ms):
+    # Returns (rows, regressions); rows are (size, route, old p50, new p50, change, old queries, new queries)
+    old_sizes = index_results(before)
+    rows = []
+    regressions = []
+    for size, routes in index_results(after).items():
+        old_routes = old_sizes.get(size, {})
+        for route, stats in routes.items():
+            old = old_routes.get(route)
+            if not old or old['p50_ms'] is None or stats['p50_ms'] is None:
+                continue
+            change = (stats['p50_ms'] - old['p50_ms']) / old['p50_ms'] if old['p50_ms'] else 0
+            row = (f'{size[0]}x{size[1]}', route, old['p50_ms'], stats['p50_ms'], change, old['queries_per_request'], stats['queries_per_request'])
+            rows.append(row)
+            # Sub-millisecond routes are mostly noise, so they only regress on query count
+            slower = change > threshold and stats['p50_ms'] - old['p50_ms'] > min_ms
+            if slower or (stats['queries_per_request'] or 0) > (old['queries_per_request'] or 0):
+                regressions.append(row)
+    return rows, regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed relative p50 increase')
+    parser.add_argument('--min-ms', type=float, default=1.0, help='Ignore p50 increases smaller than this')
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    rows, regressions = compare(before, after, args.threshold, args.min_ms)
+    print(f"{'size':<10} {'route':<28} {'p50 before':>11} {'p50 after':>10} {'change':>8} {'queries':>12}")
+    for size, route, old, new, change, old_queries, new_queries in rows:
+        flag = ' !' if (size, route, old, new, change, old_queries, new_queries) in regressions else ''
+        print(f'{size:<10} {route:<28} {old:>11.2f} {new:>10.2f} {change:>+8.0%} {old_queries:>5} -> {new_queries:<5}{flag}')
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) between {before.get('commit')} and {after.get('commit')}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Generate a large synthetic dataset for performance work.
+
+Writes users x campaigns x tags with batched Core inserts into the database the
+app is configured for (set DATABASE_URL to target a scratch file):
+
+    DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.datagen --users 100 --campaigns 1000
+"""
+import argparse
+import random
+import time
+
+from werkzeug.security import generate_password_hash
+
+from app import Campaign, Tag, User, app, campaign_tags, db, init_database, insert_campaigns, rebuild_campaign_stats
+from timeseries import rebuild_rollups, record_opening_events
+
+PLATFORMS = ['LinkedIn', 'Email', 'Twitter', 'Facebook', 'Instagram', 'Phone', 'In Person', 'Other']
+STATUSES = ['active', 'completed', 'draft']
+STATUS_WEIGHTS = [0.6, 0.3, 0.1]
+
+def generate(users=10, campaigns_per_user=100, tags=20, seed=0, batch_size=5000):
+    # Returns the ids of the generated users; the caller needs an app context
+    init_database()
+    rng = random.Random(seed)
+    # Every user shares one hash, computing thousands of them would dominate the run
+    password = generate_password_hash('password', app.config['PASSWORD_HASH_METHOD'])
+    offset = db.session.scalar(db.select(db.func.count(User.id)))
+
+    user_ids = db.session.scalars(
+        db.insert(User).returning(User.id, sort_by_parameter_order=True),
+        [{'name': f'Bench User {offset + i}', 'email': f'bench{offset + i}@example.com', 'password': password, 'role': 'user'} for i in range(users)]
+    ).all()
+
+    names = [f'Tag {i}' for i in range(tags)]
+    existing = set(db.session.scalars(db.select(Tag.name).where(Tag.name.in_(names))))
+    missing = [{'name': name} for name in names if name not in existing]
+    if missing:
+        db.session.execute(db.insert(Tag), missing)
+    tag_ids = list(db.session.scalars(db.select(Tag.id).where(Tag.name.in_(names))))
+
+    def campaign_rows():
+        for owner_id in user_ids:
+            for i in range(campaigns_per_user):
+                status = rng.choices(STATUSES, weights=STATUS_WEIGHTS)[0]
+                leads = rng.randint(0, 2000) if status != 'draft' else 0
+                responses = int(leads * rng.uniform(0.05, 0.3))
+                yield {
+                    'name': f'Campaign {owner_id}-{i}',
+                    'description': 'Synthetic campaign for benchmarking',
+                    'target_audience': 'Professionals in tech',
+                    'platform': rng.choice(PLATFORMS),
+                    'budget': round(rng.uniform(1000, 20000), 2),
+                    'start_date': f'2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+                    'end_date': f'2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+                    'status': status,
+                    'leads_count': leads,
+                    'responses_count': responses,
+                    'conversion_rate': (responses / leads) * 100 if leads else None,
+                    'message_template': 'Hi {{name}}',
+                    'owner_id': owner_id,
+                    'created_date': f'2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}'
+                }
+
+    first_campaign_id = (db.session.scalar(db.select(db.func.max(Campaign.id))) or 0) + 1
+    batch = []
+    def flush():
+        ids = insert_campaigns(batch)
+        links = [
+            {'campaign_id': campaign_id, 'tag_id': tag_id, 'position': position}
+            for campaign_id in ids
+            for position, tag_id in enumerate(rng.sample(tag_ids, min(len(tag_ids), rng.randint(1, 3))))
+        ]
+        if links:
+            db.session.execute(db.insert(campaign_tags), links)
+
+    for row in campaign_rows():
+        batch.append(row)
+        if len(batch) >= batch_size:
+            flush()
+            batch = []
+    if batch:
+        flush()
+
+    rebuild_campaign_stats()
+    # The counters become the campaigns' opening history, dated on their creation day
+    record_opening_events(db.session.connection(), first_campaign_id)
+    rebuild_rollups(db.session.connection())
+    db.session.commit()
+    return user_ids
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--campaigns', type=int, default=100, help='Campaigns per user')
+    parser.add_argument('--tags', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with app.app_context():
+        generate(args.users, args.campaigns, args.tags, args.seed)
+    elapsed = time.perf_counter() - started
+    print(f"Created {args.users} users and {args.users * args.campaigns} campaigns in {elapsed:.1f}s")
+
+if __name__ == '__main__':
+    main()
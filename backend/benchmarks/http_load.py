@@ -0,0 +1,139 @@
+"""Compare latency and throughput of the WSGI and ASGI entry points.
+
+Starts the Flask development server (threaded, as `python app.py` does) and
+uvicorn on a scratch database initialized with `flask init`, seeds it over the
+API, then fires concurrent GETs at both. Run from the backend directory:
+
+    python -m benchmarks.http_load --concurrency 200 --seconds 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+SERVERS = {
+    'wsgi': [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--with-threads', '--port', '{port}'],
+    'asgi': [sys.executable, '-m', 'uvicorn', 'asgi:app', '--log-level', 'warning', '--port', '{port}']
+}
+
+def start_server(kind, port, env):
+    command = [part.format(port=port) for part in SERVERS[kind]]
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(base_url + '/api/campaigns?limit=1', timeout=1)
+            return process, base_url
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f'{kind} server did not start on port {port}')
+
+def seed(base_url, campaigns):
+    # One user owning `campaigns` rows, loaded through the bulk endpoint
+    response = httpx.post(base_url + '/api/auth/register', json={'name': 'Bench', 'email': 'bench@example.com', 'password': 'bench'})
+    data = response.json()
+    headers = {'Authorization': 'Bearer ' + data['access_token']}
+    rows = [{
+        'name': f'Campaign {i}',
+        'description': 'Benchmark campaign',
+        'target_audience': 'Everyone',
+        'platform': ['LinkedIn', 'Email', 'Twitter'][i % 3],
+        'budget': 1000 + i,
+        'start_date': '2024-01-01',
+        'end_date': '2024-12-31',
+        'status': ['active', 'completed', 'draft'][i % 3],
+        'leads_count': i % 500,
+        'responses_count': i % 50,
+        'tags': ['B2B', 'Tech'] if i % 2 else ['B2C']
+    } for i in range(campaigns)]
+    httpx.post(base_url + '/api/campaigns/bulk', json=rows, headers=headers, timeout=120)
+    return data['user']['id'], headers
+
+async def run_load(base_url, paths, headers, concurrency, seconds):
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + seconds
+
+    async def worker(client, offset):
+        nonlocal errors
+        i = offset
+        while time.monotonic() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                response = await client.get(path, headers=headers)
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client, i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2) if latencies else None
+
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_sec': round(len(latencies) / elapsed, 1),
+        'p50_ms': percentile(0.50),
+        'p99_ms': percentile(0.99)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--campaigns', type=int, default=2000)
+    parser.add_argument('--servers', default='wsgi,asgi')
+    parser.add_argument('--cache', default='none', help='CACHE_BACKEND for the servers under test')
+    args = parser.parse_args()
+
+    results = []
+    for number, kind in enumerate(args.servers.split(',')):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ,
+                DATABASE_URL='sqlite:///' + os.path.join(tmp, 'bench.db'),
+                CACHE_BACKEND=args.cache,
+                HASH_WORKERS='0',
+                AUTH_IP_ATTEMPT_LIMIT='1000000'
+            )
+            subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'init'], env=env, stdout=subprocess.DEVNULL, check=True)
+            process, base_url = start_server(kind, 5100 + number, env)
+            try:
+                user_id, headers = seed(base_url, args.campaigns)
+                paths = [
+                    '/api/campaigns?limit=50',
+                    f'/api/campaigns/user/{user_id}?limit=50',
+                    '/api/campaigns?q=campaign&status=active,completed&limit=50',
+                    f'/api/campaigns/user/{user_id}?tags=B2B&budget_min=1500&created_from=2024-01-01&limit=50',
+                    f'/api/campaigns/stats/{user_id}',
+                    '/api/auth/me'
+                ]
+                result = asyncio.run(run_load(base_url, paths, headers, args.concurrency, args.seconds))
+                results.append({'server': kind, 'concurrency': args.concurrency, **result})
+            finally:
+                process.terminate()
+                process.wait()
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
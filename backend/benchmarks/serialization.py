@@ -0,0 +1,83 @@
+"""Measure campaign list serialization: rows to dicts, then dicts to JSON.
+
+Fills a scratch database with benchmarks.datagen and times each stage for the
+full campaign payload, comparing the stdlib encoder with the orjson-backed
+provider (when orjson is installed) and checking both produce the same bytes:
+
+    python -m benchmarks.serialization --campaigns 10000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+def mapping_rows_to_dicts(rows, fields, tags):
+    # The per-field row._mapping lookup used before campaign_rows_to_dicts, kept as the baseline
+    campaigns = []
+    for row in rows:
+        data = {}
+        for field in fields:
+            if field == 'tags':
+                data[field] = tags.get(row.id, [])
+                continue
+            value = row._mapping[field]
+            if field in ('id', 'owner_id'):
+                value = str(value)
+            data[field] = value
+        campaigns.append(data)
+    return campaigns
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return result, round(min(timings) * 1000, 2)
+
+def run(campaigns, repeat):
+    from flask.json.provider import DefaultJSONProvider
+
+    from app import CAMPAIGN_FIELDS, app, campaign_rows_to_dicts, campaign_select, db, load_campaign_tags
+    from benchmarks.datagen import generate
+    from json_provider import FastJSONProvider, orjson
+
+    with app.app_context():
+        generate(users=1, campaigns_per_user=campaigns)
+        fields = list(CAMPAIGN_FIELDS)
+        rows, fetch_ms = best_of(repeat, lambda: db.session.execute(campaign_select(fields)).all())
+        tags = load_campaign_tags([row.id for row in rows])
+
+        baseline, mapping_ms = best_of(repeat, lambda: mapping_rows_to_dicts(rows, fields, tags))
+        dicts, tuple_ms = best_of(repeat, lambda: campaign_rows_to_dicts(rows, fields, tags))
+        assert baseline == dicts
+
+        payload = {'campaigns': dicts}
+        stdlib_body, stdlib_ms = best_of(repeat, lambda: DefaultJSONProvider(app).dumps(payload, separators=(',', ':')))
+        fast_body, fast_ms = best_of(repeat, lambda: FastJSONProvider(app).dumps(payload, separators=(',', ':')))
+
+    return {
+        'campaigns': campaigns,
+        'orjson': orjson.__version__ if orjson is not None else None,
+        'fetch_ms': fetch_ms,
+        'rows_to_dicts_ms': {'row_mapping': mapping_ms, 'row_tuples': tuple_ms},
+        'dumps_ms': {'stdlib': stdlib_ms, 'fast_provider': fast_ms},
+        'identical_output': stdlib_body == fast_body,
+        'body_bytes': len(fast_body)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--campaigns', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Must be set before app is imported
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        os.environ.setdefault('HASH_WORKERS', '0')
+        print(json.dumps(run(args.campaigns, args.repeat), indent=2))
+
+if __name__ == '__main__':
+    main()
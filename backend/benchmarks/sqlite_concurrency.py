@@ -0,0 +1,109 @@
+"""Compare read/write throughput of the engine profiles under concurrent access.
+
+Run from the backend directory:
+
+    python -m benchmarks.sqlite_concurrency --readers 8 --writers 2 --seconds 5
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from engine_profile import apply_sqlite_pragmas, engine_options
+
+def create_table(engine, rows, owners):
+    with engine.begin() as conn:
+        conn.execute(text(
+            'CREATE TABLE campaign (id INTEGER PRIMARY KEY, owner_id INTEGER NOT NULL, '
+            'status VARCHAR(20) NOT NULL, budget FLOAT NOT NULL)'
+        ))
+        conn.execute(text('CREATE INDEX ix_campaign_owner_id ON campaign (owner_id)'))
+        conn.execute(
+            text('INSERT INTO campaign (owner_id, status, budget) VALUES (:owner_id, :status, :budget)'),
+            [{'owner_id': i % owners, 'status': 'active', 'budget': 1000.0} for i in range(rows)]
+        )
+
+def run_profile(profile, readers, writers, seconds, rows, owners):
+    with tempfile.TemporaryDirectory() as tmp:
+        uri = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        engine = create_engine(uri, **engine_options(uri, profile, pool_size=readers + writers, max_overflow=0))
+        apply_sqlite_pragmas(engine, profile)
+        create_table(engine, rows, owners)
+
+        counts = {'reads': 0, 'writes': 0, 'errors': 0}
+        lock = threading.Lock()
+        stop = threading.Event()
+
+        def reader():
+            done = errors = 0
+            while not stop.is_set():
+                try:
+                    with engine.connect() as conn:
+                        conn.execute(
+                            text('SELECT count(*), sum(budget) FROM campaign WHERE owner_id = :owner_id'),
+                            {'owner_id': random.randrange(owners)}
+                        ).one()
+                    done += 1
+                except OperationalError:
+                    errors += 1
+            with lock:
+                counts['reads'] += done
+                counts['errors'] += errors
+
+        def writer():
+            done = errors = 0
+            while not stop.is_set():
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(
+                            text('UPDATE campaign SET budget = budget + 1 WHERE id = :id'),
+                            {'id': random.randint(1, rows)}
+                        )
+                    done += 1
+                except OperationalError:
+                    errors += 1
+            with lock:
+                counts['writes'] += done
+                counts['errors'] += errors
+
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        threads += [threading.Thread(target=writer) for _ in range(writers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    return {
+        'profile': profile,
+        'reads_per_sec': round(counts['reads'] / seconds, 1),
+        'writes_per_sec': round(counts['writes'] / seconds, 1),
+        'errors': counts['errors']
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--owners', type=int, default=100)
+    parser.add_argument('--profiles', default='baseline,tuned')
+    args = parser.parse_args()
+
+    results = [
+        run_profile(profile, args.readers, args.writers, args.seconds, args.rows, args.owners)
+        for profile in args.profiles.split(',')
+    ]
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
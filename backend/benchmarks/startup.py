@@ -0,0 +1,108 @@
+"""Measure what a worker pays to import and start the app.
+
+Each step runs in a fresh interpreter on a scratch database: importing `app`
+(with the slowest direct imports reported by `python -X importtime`), the SQL
+statements executed while importing, create_app(), `flask init` and the first
+request:
+
+    python -m benchmarks.startup --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+def measure():
+    # Runs in the child interpreter, after DATABASE_URL points at a scratch file
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    statements = []
+    event.listen(Engine, 'before_cursor_execute', lambda conn, cursor, statement, *args: statements.append(statement))
+    database = os.environ['DATABASE_URL'].replace('sqlite:///', '', 1)
+
+    started = time.perf_counter()
+    import app as module
+    import_seconds = time.perf_counter() - started
+    import_statements = len(statements)
+    database_created = os.path.exists(database)
+
+    started = time.perf_counter()
+    module.create_app()
+    create_app_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with module.app.app_context():
+        module.init_database()
+    init_seconds = time.perf_counter() - started
+
+    client = module.app.test_client()
+    started = time.perf_counter()
+    client.get('/api/campaigns?limit=10')
+    first_request_seconds = time.perf_counter() - started
+
+    return {
+        'import_ms': import_seconds * 1000,
+        'import_sql_statements': import_statements,
+        'import_created_database': database_created,
+        'create_app_ms': create_app_seconds * 1000,
+        'init_ms': init_seconds * 1000,
+        'first_request_ms': first_request_seconds * 1000
+    }
+
+def slowest_imports(env, top):
+    # Direct imports of app from `-X importtime`, which lists each module after the ones it imports
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], env=env, capture_output=True, text=True, check=True).stderr
+    children = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children.append((name.strip(), int(cumulative) / 1000))
+        elif depth == 0:
+            if name.strip() == 'app':
+                return {
+                    'total_ms': round(int(cumulative) / 1000, 1),
+                    'slowest': {module: round(ms, 1) for module, ms in sorted(children, key=lambda entry: -entry[1])[:top]}
+                }
+            children = []
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='Fresh interpreters to average over')
+    parser.add_argument('--top', type=int, default=10, help='Slowest direct imports to list')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure()))
+        return
+
+    runs = []
+    for _ in range(args.repeat):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(tmp, 'bench.db'), HASH_WORKERS='0')
+            output = subprocess.run([sys.executable, '-m', 'benchmarks.startup', '--child'], env=env, capture_output=True, text=True, check=True).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(tmp, 'bench.db'), HASH_WORKERS='0')
+        imports = slowest_imports(env, args.top)
+
+    report = {name: round(statistics.median(run[name] for run in runs), 1) for name in runs[0] if name.endswith('_ms')}
+    report['import_sql_statements'] = max(run['import_sql_statements'] for run in runs)
+    report['import_created_database'] = any(run['import_created_database'] for run in runs)
+    report['importtime'] = imports
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
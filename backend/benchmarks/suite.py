@@ -0,0 +1,210 @@
+"""Benchmark every API route at increasing dataset sizes.
+
+Each size runs in a fresh process on a scratch database filled by
+benchmarks.datagen. The Flask test client drives every route, and the run records
+throughput, latency percentiles and SQL queries per request for every route, and
+the peak RSS of the whole run. Results
+are written as JSON so two commits can be compared with benchmarks.compare:
+
+    python -m benchmarks.suite --sizes 10x100,50x200,100x1000 --output bench.json
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Per-route request builders: (ctx, i) -> (method, path, request kwargs)
+SCENARIOS = {
+    'register': lambda ctx, i: ('POST', '/api/auth/register', {'json': {'name': 'New', 'email': f'new{i}@example.com', 'password': 'password'}}),
+    'login': lambda ctx, i: ('POST', '/api/auth/login', {'json': {'email': ctx['email'], 'password': 'password'}}),
+    'logout': lambda ctx, i: ('POST', '/api/auth/logout', {}),
+    'get_current_user': lambda ctx, i: ('GET', '/api/auth/me', {'headers': ctx['headers']}),
+    'get_all_campaigns': lambda ctx, i: ('GET', '/api/campaigns', {}),
+    'get_all_campaigns_page': lambda ctx, i: ('GET', '/api/campaigns?limit=100', {}),
+    'export_campaigns': lambda ctx, i: ('GET', '/api/campaigns/export?format=ndjson', {'headers': ctx['admin_headers']}),
+    'get_user_campaigns': lambda ctx, i: ('GET', f"/api/campaigns/user/{ctx['user_id']}", {}),
+    'get_campaign_stats': lambda ctx, i: ('GET', f"/api/campaigns/stats/{ctx['user_id']}", {}),
+    'get_all_campaign_stats': lambda ctx, i: ('GET', '/api/campaigns/stats', {'headers': ctx['admin_headers']}),
+    'create_campaign': lambda ctx, i: ('POST', '/api/campaigns', {'json': campaign_payload(i), 'headers': ctx['headers']}),
+    'bulk_import_campaigns': lambda ctx, i: ('POST', '/api/campaigns/bulk', {'json': [campaign_payload(i * 100 + j) for j in range(100)], 'headers': ctx['headers']}),
+    'update_campaign': lambda ctx, i: ('PUT', f"/api/campaigns/{ctx['campaign_ids'][i % len(ctx['campaign_ids'])]}", {'json': {'leads_count': 100 + i, 'responses_count': i}, 'headers': ctx['headers']}),
+    'update_campaigns': lambda ctx, i: ('PATCH', '/api/campaigns', {'json': {'ids': ctx['campaign_ids'][:100], 'changes': {'status': 'active', 'leads_count': 200 + i}}, 'headers': ctx['headers']}),
+    'delete_campaign': lambda ctx, i: ('DELETE', f"/api/campaigns/{ctx['campaign_ids'].pop()}", {'headers': ctx['headers']}),
+    'delete_campaigns': lambda ctx, i: ('DELETE', '/api/campaigns', {'json': {'ids': [ctx['campaign_ids'].pop() for _ in range(10)]}, 'headers': ctx['headers']}),
+    'get_campaign_timeseries': lambda ctx, i: ('GET', f"/api/campaigns/{ctx['campaign_ids'][0]}/timeseries?period=week", {}),
+    'get_user_timeseries': lambda ctx, i: ('GET', f"/api/campaigns/stats/{ctx['user_id']}/timeseries?period=day&from=2024-01-01&to=2024-12-31", {}),
+    'get_campaign_changes': lambda ctx, i: ('GET', '/api/campaigns/changes', {'headers': {'Last-Event-ID': '0'}}),
+    'get_platform_timeseries': lambda ctx, i: ('GET', '/api/campaigns/platforms/Email/timeseries?period=week', {'headers': ctx['admin_headers']}),
+    'get_cache_stats': lambda ctx, i: ('GET', '/api/cache/stats', {'headers': ctx['admin_headers']}),
+    'get_metrics': lambda ctx, i: ('GET', '/metrics', {}),
+    'get_tasks': lambda ctx, i: ('GET', '/api/tasks', {'headers': ctx['headers']}),
+    'get_task': lambda ctx, i: ('GET', f"/api/tasks/{ctx['task_id']}", {'headers': ctx['headers']}),
+    'get_task_result': lambda ctx, i: ('GET', f"/api/tasks/{ctx['task_id']}/result", {'headers': ctx['headers']}),
+    # Queues a task per request; last so the background rebuilds do not overlap other routes
+    'rebuild_campaign_stats_task': lambda ctx, i: ('POST', '/api/campaigns/stats/rebuild', {'headers': ctx['admin_headers']})
+}
+
+def campaign_payload(i):
+    return {
+        'name': f'Benchmark {i}',
+        'description': 'Created by the benchmark suite',
+        'target_audience': 'Everyone',
+        'platform': 'Email',
+        'budget': 1000,
+        'start_date': '2024-01-01',
+        'end_date': '2024-12-31',
+        'status': 'active',
+        'leads_count': 100,
+        'responses_count': 10,
+        'tags': ['B2B', 'Tech']
+    }
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    return round(sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))] * 1000, 3)
+
+def peak_rss_mb():
+    # Process-wide high-water mark, so it only means something per dataset size; ru_maxrss is KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def run_size(users, campaigns, tags, iterations, max_seconds):
+    # Runs inside the child process, after DATABASE_URL points at a scratch file
+    from flask_jwt_extended import create_access_token
+    from sqlalchemy import event
+
+    from app import Campaign, User, app, db
+    from benchmarks.datagen import generate
+
+    with app.app_context():
+        started = time.perf_counter()
+        user_ids = generate(users, campaigns, tags)
+        generate_seconds = time.perf_counter() - started
+
+        user = db.session.get(User, user_ids[0])
+        admin = User.query.filter_by(role='admin').first()
+        ctx = {
+            'user_id': user.id,
+            'email': user.email,
+            'headers': {'Authorization': 'Bearer ' + create_access_token(identity=user.id)},
+            'admin_headers': {'Authorization': 'Bearer ' + create_access_token(identity=admin.id)},
+            'campaign_ids': list(db.session.scalars(db.select(Campaign.id).where(Campaign.owner_id == user.id)))
+        }
+
+        queries = [0]
+        def count_query(*args):
+            queries[0] += 1
+        event.listen(db.engine, 'before_cursor_execute', count_query)
+
+    endpoints = {rule.endpoint.rpartition('.')[2] for rule in app.url_map.iter_rules() if rule.endpoint != 'static'}
+    missing = sorted(endpoint for endpoint in endpoints if endpoint not in SCENARIOS)
+
+    client = app.test_client()
+    # A finished export task for the task status/result scenarios
+    ctx['task_id'] = client.get('/api/campaigns/export?format=csv&async=1', headers=ctx['headers']).get_json()['task']['id']
+    while client.get(f"/api/tasks/{ctx['task_id']}", headers=ctx['headers']).get_json()['task']['status'] in ('queued', 'running'):
+        time.sleep(0.1)
+
+    routes = {}
+    for name, scenario in SCENARIOS.items():
+        latencies = []
+        query_counts = []
+        errors = 0
+        deadline = time.perf_counter() + max_seconds
+        for i in range(iterations):
+            if time.perf_counter() > deadline or (name in ('delete_campaign', 'delete_campaigns') and len(ctx['campaign_ids']) < 12):
+                break
+            method, path, kwargs = scenario(ctx, i)
+            queries[0] = 0
+            started = time.perf_counter()
+            response = client.open(path, method=method, **kwargs)
+            response.get_data()
+            latencies.append(time.perf_counter() - started)
+            query_counts.append(queries[0])
+            if response.status_code >= 400:
+                errors += 1
+
+        latencies.sort()
+        total = sum(latencies)
+        routes[name] = {
+            'requests': len(latencies),
+            'errors': errors,
+            'requests_per_sec': round(len(latencies) / total, 1) if total else None,
+            'p50_ms': percentile(latencies, 0.50),
+            'p95_ms': percentile(latencies, 0.95),
+            'p99_ms': percentile(latencies, 0.99),
+            'queries_per_request': round(sum(query_counts) / len(query_counts), 2) if query_counts else None
+        }
+
+    return {
+        'users': users,
+        'campaigns_per_user': campaigns,
+        'total_campaigns': users * campaigns,
+        'generate_seconds': round(generate_seconds, 2),
+        'peak_rss_mb': peak_rss_mb(),
+        'routes': routes,
+        'routes_without_scenario': missing
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10x100,50x200,100x1000', help='Comma-separated USERSxCAMPAIGNS_PER_USER')
+    parser.add_argument('--tags', type=int, default=20)
+    parser.add_argument('--iterations', type=int, default=50, help='Requests per route')
+    parser.add_argument('--max-seconds', type=float, default=5, help='Time budget per route')
+    parser.add_argument('--cache', default='none', help='CACHE_BACKEND to benchmark with')
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        users, campaigns = (int(part) for part in args.sizes.split('x'))
+        print(json.dumps(run_size(users, campaigns, args.tags, args.iterations, args.max_seconds)))
+        return
+
+    results = []
+    for size in args.sizes.split(','):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ,
+                DATABASE_URL='sqlite:///' + os.path.join(tmp, 'bench.db'),
+                TASK_RESULT_DIR=os.path.join(tmp, 'task_results'),
+                CACHE_BACKEND=args.cache,
+                HASH_WORKERS='0',
+                AUTH_EMAIL_ATTEMPT_LIMIT='1000000',
+                AUTH_IP_ATTEMPT_LIMIT='1000000'
+            )
+            command = [
+                sys.executable, '-m', 'benchmarks.suite', '--child', '--sizes', size, '--tags', str(args.tags),
+                '--iterations', str(args.iterations), '--max-seconds', str(args.max_seconds)
+            ]
+            output = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+            print(f"Finished {size}", file=sys.stderr)
+
+    report = json.dumps({
+        'commit': git_commit(),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'cache_backend': args.cache,
+        'results': results
+    }, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + '\n')
+    else:
+        print(report)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+import threading
+import time
+
+# Response caches used by the campaign read endpoints. Every backend exposes the
+# same get/set/delete_prefix/clear/stats calls so the app does not care which one
+# is configured.
+
+class LRUCache:
+    # In-process cache bounded by entry count and by the total size of the cached bodies, with a TTL per entry
+    def __init__(self, maxsize=1024, ttl=30, maxbytes=64 * 1024 * 1024):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                    self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            # A body larger than the whole budget would only flush everything else
+            if len(value) > self.maxbytes:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._bytes += len(value)
+            while len(self._entries) > self.maxsize or self._bytes > self.maxbytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        # Caller holds the lock
+        self._bytes -= len(self._entries.pop(key)[1])
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        return {
+            'backend': 'memory',
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'bytes': self._bytes,
+            'maxbytes': self.maxbytes
+        }
+
+class LocalSharedClient:
+    # Stand-in for a Redis client: the subset of redis-py calls SharedCache uses, kept in memory
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] is not None and entry[0] < time.time():
+                del self._data[key]
+                return None
+            return entry[1]
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = (time.time() + ex if ex else None, value)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def scan_iter(self, match='*'):
+        with self._lock:
+            keys = list(self._data)
+        return [key for key in keys if fnmatchcase(key, match)]
+
+class SharedCache:
+    # Cache stored in an external key/value server so every worker sees the same entries
+    def __init__(self, client, ttl=30, namespace='leadcampaign:'):
+        self.client = client
+        self.ttl = ttl
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.client.get(self.namespace + key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.client.set(self.namespace + key, value, ex=self.ttl)
+
+    def delete_prefix(self, prefix):
+        keys = list(self.client.scan_iter(match=self.namespace + prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+    def clear(self):
+        self.delete_prefix('')
+
+    def stats(self):
+        # Expiry happens inside the server, so evictions are not visible from here
+        return {
+            'backend': 'shared',
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': None,
+            'size': None,
+            'maxsize': None,
+            'bytes': None,
+            'maxbytes': None
+        }
+
+class NullCache:
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def delete_prefix(self, prefix):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return {'backend': 'none', 'hits': 0, 'misses': 0, 'evictions': 0, 'size': 0, 'maxsize': 0, 'bytes': 0, 'maxbytes': 0}
+
+def create_cache(config):
+    backend = config.get('CACHE_BACKEND', 'memory')
+    ttl = config.get('CACHE_TTL', 30)
+    if backend == 'memory':
+        return LRUCache(maxsize=config.get('CACHE_MAX_ENTRIES', 1024), ttl=ttl, maxbytes=config.get('CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    if backend == 'local-shared':
+        return SharedCache(LocalSharedClient(), ttl=ttl)
+    if backend == 'redis':
+        # Optional dependency, only needed when a Redis server is configured
+        import redis
+        return SharedCache(redis.Redis.from_url(config['CACHE_REDIS_URL']), ttl=ttl)
+    if backend == 'none':
+        return NullCache()
+    raise ValueError(f'Unknown CACHE_BACKEND: {backend}')
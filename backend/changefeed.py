@@ -0,0 +1,155 @@
+import asyncio
+import collections
+import json
+import logging
+import threading
+
+# Campaign change feed. Every campaign write appends rows to the campaign_change
+# table (see app.py) in its own transaction; the table is the bounded log that
+# Server-Sent Events clients resume from with Last-Event-ID. After the commit the
+# writer calls ChangeNotifier.notify(), which wakes the ChangeHub of the same
+# process at once. A hub runs one poller per process on the event loop and fans
+# new rows out to its subscribers, so idle connections cost a small object each
+# rather than a thread; polling also picks up changes committed by other
+# processes (other workers, `flask worker`) within one interval. A write larger
+# than the log prunes its own rows before the hub can read them; the hub then
+# drops every stream, and the reconnecting clients get a reset event because
+# their Last-Event-ID is no longer in the log.
+
+logger = logging.getLogger(__name__)
+
+class ChangeNotifier:
+    # Thread-safe in-process pub/sub: callbacks run in the writer's thread, so they must only schedule work
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._callbacks = self._callbacks + [callback]
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            self._callbacks = [other for other in self._callbacks if other is not callback]
+
+    def notify(self):
+        for callback in self._callbacks:
+            try:
+                callback()
+            except Exception:
+                logger.exception('Change notification failed')
+
+class Subscription:
+    # One stream's pending rows; overflowed means it fell behind and must resync
+    def __init__(self, match, limit):
+        self.match = match
+        self.limit = limit
+        self.pending = collections.deque()
+        self.ready = asyncio.Event()
+        self.overflowed = False
+
+    def push(self, row):
+        if len(self.pending) >= self.limit:
+            self.overflowed = True
+        else:
+            self.pending.append(row)
+        self.ready.set()
+
+    def lose(self):
+        # Rows it should have seen are gone from the log
+        self.overflowed = True
+        self.ready.set()
+
+class ChangeHub:
+    def __init__(self, fetch, newest, notifier, poll_interval=1.0, queue_size=1000):
+        # fetch(after) returns (oldest logged id, change rows with id > after oldest first); newest() the latest id
+        # (both coroutines)
+        self.fetch = fetch
+        self.newest = newest
+        self.notifier = notifier
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self.position = None
+        self._subscriptions = set()
+        self._wake = None
+        self._task = None
+
+    async def start(self):
+        # Called on the event loop before any stream is served, e.g. from the ASGI lifespan
+        loop = asyncio.get_running_loop()
+        await self._load_position()
+        self._wake = asyncio.Event()
+        self._notify = lambda: loop.call_soon_threadsafe(self._wake.set)
+        self.notifier.subscribe(self._notify)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self.notifier.unsubscribe(self._notify)
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def subscribe(self, match):
+        subscription = Subscription(match, self.queue_size)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self._subscriptions.discard(subscription)
+
+    async def _load_position(self):
+        # Streams read what was logged before they subscribed themselves, so the hub starts at the newest change
+        try:
+            self.position = await self.newest() or 0
+        except Exception:
+            self.position = None
+            logger.exception('Change feed position lookup failed')
+        return self.position is not None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self.position is None and not await self._load_position():
+                continue
+            try:
+                await self.poll()
+            except Exception:
+                logger.exception('Change feed poll failed')
+
+    async def poll(self):
+        oldest, rows = await self.fetch(self.position)
+        if oldest is not None and oldest > self.position + 1:
+            # Changes after the position were pruned before this poll read them
+            for subscription in tuple(self._subscriptions):
+                subscription.lose()
+        for row in rows:
+            for subscription in tuple(self._subscriptions):
+                if subscription.match(row):
+                    subscription.push(row)
+            self.position = row.id
+
+def format_event(data=None, event_id=None, event=None, retry=None):
+    # One SSE message; an id without data only moves the client's Last-Event-ID
+    lines = []
+    if retry is not None:
+        lines.append(f'retry: {retry}')
+    if event:
+        lines.append(f'event: {event}')
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    if data is not None:
+        lines.append('data: ' + json.dumps(data, separators=(',', ':')))
+    return '\n'.join(lines) + '\n\n'
+
+def format_heartbeat():
+    # Comment lines keep proxies from closing idle connections and are ignored by EventSource
+    return ': heartbeat\n\n'
@@ -1,5 +1,6 @@
 
-from app import db, User, Campaign
+from app import app, db, User, Campaign, CampaignChange, CampaignMetricEvent, CampaignMetricRollup, CampaignStatsSnapshot, bump_data_versions, campaign_tags, init_database, rebuild_all_campaign_stats, set_campaign_tags
+from timeseries import rebuild_rollups, record_opening_events
 from werkzeug.security import generate_password_hash
 from datetime import datetime, timedelta
 import random
@@ -16,8 +17,16 @@ tags = ['B2B', 'B2C', 'Tech', 'Finance', 'Healthcare', 'Education', 'Marketing',
         'Lead Generation', 'Conversion', 'Cold Outreach', 'Warm Leads', 'Event', 'Webinar', 'Partnership']
 
 def create_mock_data():
-    with db.app.app_context():
-        # Clear existing data
+    with app.app_context():
+        init_database()
+
+        # Clear existing data; the change log goes too, so clients resuming the feed get a reset
+        previous_user_ids = db.session.scalars(db.select(User.id)).all()
+        db.session.query(CampaignChange).delete()
+        db.session.query(CampaignStatsSnapshot).delete()
+        db.session.query(CampaignMetricRollup).delete()
+        db.session.query(CampaignMetricEvent).delete()
+        db.session.execute(db.delete(campaign_tags))
         db.session.query(Campaign).delete()
         db.session.query(User).delete()
         db.session.commit()
@@ -64,7 +73,7 @@ def create_mock_data():
                 'status': 'active',
                 'leads_count': 250,
                 'responses_count': 48,
-                'message_template': 'Hi {{name}}, I noticed your company is expanding its tech division. I'd love to show you how our product can help with scaling challenges.',
+                'message_template': "Hi {{name}}, I noticed your company is expanding its tech division. I'd love to show you how our product can help with scaling challenges.",
                 'tags': 'Tech,SaaS,B2B'
             },
             {
@@ -131,10 +140,11 @@ def create_mock_data():
                 conversion_rate=conversion_rate,
                 message_template=campaign_data['message_template'],
                 owner_id=admin.id,
-                created_date=(datetime.now() - timedelta(days=random.randint(1, 30))).strftime('%Y-%m-%d'),
-                tags=campaign_data['tags']
+                created_date=(datetime.now() - timedelta(days=random.randint(1, 30))).strftime('%Y-%m-%d')
             )
             db.session.add(campaign)
+            db.session.flush()
+            set_campaign_tags(campaign.id, campaign_data['tags'].split(','))
             campaigns_count += 1
 
         # Create random campaigns for each regular user
@@ -171,7 +181,6 @@ def create_mock_data():
                 
                 # Random tags (2-4 tags)
                 selected_tags = random.sample(tags, random.randint(2, 4))
-                tags_str = ','.join(selected_tags)
                 
                 # Message template examples
                 message_templates = [
@@ -195,15 +204,22 @@ def create_mock_data():
                     conversion_rate=conversion_rate,
                     message_template=random.choice(message_templates) if random.random() > 0.3 else "",
                     owner_id=user.id,
-                    created_date=created_date,
-                    tags=tags_str
+                    created_date=created_date
                 )
                 
                 db.session.add(campaign)
+                db.session.flush()
+                set_campaign_tags(campaign.id, selected_tags)
                 campaigns_count += 1
         
         db.session.commit()
         print(f"Created {campaigns_count} campaigns")
+
+        record_opening_events(db.session.connection())
+        rebuild_rollups(db.session.connection())
+        # Move the data versions of every user, old and new, and clear the cache so no ETag or cached list survives
+        bump_data_versions(previous_user_ids)
+        rebuild_all_campaign_stats()
         print("Mock data creation completed successfully!")
 
 if __name__ == '__main__':
@@ -0,0 +1,33 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# JSON provider that encodes responses with orjson when it is installed. Flask's
+# default output (sorted keys, compact separators, ASCII-only) is reproduced;
+# payloads orjson cannot write the same way fall back to the stdlib encoder.
+# Two cases are not detected, since scanning for them costs more than the
+# encoding saves: floats below 1e-4 or from 1e16 up use a different but equal
+# notation (1e-05 becomes 0.00001, 1e+16 becomes 1e16), and NaN/Infinity become null.
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+COMPACT = {'separators': (',', ':')}
+
+class FastJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        # Only the compact form jsonify uses outside debug mode matches orjson's output
+        if orjson is not None and kwargs == COMPACT and self.sort_keys and self.ensure_ascii:
+            try:
+                data = orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS)
+            except TypeError:
+                # Non-string keys, integers beyond 64 bits and other values orjson rejects
+                pass
+            else:
+                # Non-ASCII text would need \u escapes, which orjson does not write
+                if data.isascii():
+                    return data.decode('ascii')
+        return super().dumps(obj, **kwargs)
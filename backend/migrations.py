@@ -0,0 +1,130 @@
+from datetime import datetime
+from sqlalchemy import inspect, text
+from timeseries import rebuild_rollups, record_opening_events
+
+# Ordered list of (version, description, function) schema migrations.
+# Fresh databases get their tables (and the indexes declared on the models)
+# from create_all(); migrations bring existing databases up to the same shape,
+# so every step must be safe to run against a table that already has it.
+MIGRATIONS = []
+
+def migration(version, description):
+    def register(func):
+        MIGRATIONS.append((version, description, func))
+        return func
+    return register
+
+@migration(1, 'Add indexes for hot campaign filters')
+def add_campaign_indexes(conn):
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_campaign_owner_id_status ON campaign (owner_id, status)'))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_campaign_status_created_date ON campaign (status, created_date)'))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_campaign_platform ON campaign (platform)'))
+
+@migration(2, 'Move comma-separated campaign tags into campaign_tags')
+def normalize_campaign_tags(conn):
+    columns = {column['name'] for column in inspect(conn).get_columns('campaign')}
+    if 'tags' not in columns:
+        return
+
+    links = []
+    for row in conn.execute(text("SELECT id, tags FROM campaign WHERE tags IS NOT NULL AND tags != ''")).all():
+        names = dict.fromkeys(name for name in row.tags.split(',') if name)
+        links += [(row.id, name, position) for position, name in enumerate(names)]
+
+    names = {name for _, name, _ in links}
+    existing = {row.name for row in conn.execute(text('SELECT name FROM tag'))}
+    missing = [{'name': name} for name in sorted(names - existing)]
+    if missing:
+        conn.execute(text('INSERT INTO tag (name) VALUES (:name)'), missing)
+    tag_ids = {row.name: row.id for row in conn.execute(text('SELECT id, name FROM tag'))}
+
+    if links:
+        conn.execute(
+            text('INSERT INTO campaign_tags (campaign_id, tag_id, position) VALUES (:campaign_id, :tag_id, :position)'),
+            [{'campaign_id': campaign_id, 'tag_id': tag_ids[name], 'position': position} for campaign_id, name, position in links]
+        )
+    conn.execute(text('ALTER TABLE campaign DROP COLUMN tags'))
+
+@migration(3, 'Add full-text search index over campaign text columns')
+def add_campaign_search_index(conn):
+    # External-content FTS5 table: it stores only the index, the triggers keep it in step with campaign
+    if conn.dialect.name != 'sqlite':
+        return
+
+    columns = 'name, description, target_audience, message_template'
+    new_values = 'new.id, new.name, new.description, new.target_audience, new.message_template'
+    old_values = "'delete', old.id, old.name, old.description, old.target_audience, old.message_template"
+    conn.execute(text(f"CREATE VIRTUAL TABLE IF NOT EXISTS campaign_fts USING fts5({columns}, content='campaign', content_rowid='id')"))
+    conn.execute(text(
+        'CREATE TRIGGER IF NOT EXISTS campaign_fts_insert AFTER INSERT ON campaign BEGIN '
+        f'INSERT INTO campaign_fts (rowid, {columns}) VALUES ({new_values}); END'
+    ))
+    conn.execute(text(
+        'CREATE TRIGGER IF NOT EXISTS campaign_fts_delete AFTER DELETE ON campaign BEGIN '
+        f'INSERT INTO campaign_fts (campaign_fts, rowid, {columns}) VALUES ({old_values}); END'
+    ))
+    conn.execute(text(
+        f'CREATE TRIGGER IF NOT EXISTS campaign_fts_update AFTER UPDATE OF {columns} ON campaign BEGIN '
+        f'INSERT INTO campaign_fts (campaign_fts, rowid, {columns}) VALUES ({old_values}); '
+        f'INSERT INTO campaign_fts (rowid, {columns}) VALUES ({new_values}); END'
+    ))
+    conn.execute(text("INSERT INTO campaign_fts (campaign_fts) VALUES ('rebuild')"))
+
+@migration(4, 'Seed the leads/responses history with current campaign counters')
+def seed_campaign_metric_history(conn):
+    if conn.execute(text('SELECT 1 FROM campaign_metric_event LIMIT 1')).first():
+        return
+    record_opening_events(conn)
+    rebuild_rollups(conn)
+
+@migration(5, 'Index campaigns by owner in id order')
+def add_campaign_owner_id_index(conn):
+    # (owner_id, status) cannot return a user's campaigns in id order, so every keyset page sorted them all
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_campaign_owner_id_id ON campaign (owner_id, id)'))
+
+@migration(6, 'Add the campaign insert sentinel column')
+def add_campaign_insert_sentinel(conn):
+    columns = {column['name'] for column in inspect(conn).get_columns('campaign')}
+    if '_sentinel' not in columns:
+        conn.execute(text('ALTER TABLE campaign ADD COLUMN _sentinel INTEGER'))
+
+def applied_migrations(conn):
+    rows = conn.execute(text('SELECT version FROM schema_migrations'))
+    return {row.version for row in rows}
+
+def run_migrations(db):
+    # Create missing tables and apply pending migrations in one transaction
+    applied = []
+    with db.engine.begin() as conn:
+        conn.execute(text(
+            'CREATE TABLE IF NOT EXISTS schema_migrations ('
+            'version INTEGER PRIMARY KEY, '
+            'description VARCHAR(200) NOT NULL, '
+            'applied_at VARCHAR(19) NOT NULL)'
+        ))
+        db.metadata.create_all(conn)
+
+        done = applied_migrations(conn)
+        for version, description, func in sorted(MIGRATIONS, key=lambda entry: entry[0]):
+            if version in done:
+                continue
+            func(conn)
+            conn.execute(
+                text('INSERT INTO schema_migrations (version, description, applied_at) VALUES (:version, :description, :applied_at)'),
+                {'version': version, 'description': description, 'applied_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+            )
+            applied.append((version, description))
+    return applied
+
+def explain_query_plan(conn, statement):
+    # Return the detail column of SQLite's EXPLAIN QUERY PLAN for a select
+    sql = str(statement.compile(dialect=conn.dialect, compile_kwargs={'literal_binds': True}))
+    return [row[-1] for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql)]
+
+def full_table_scans(plan, table):
+    # SEARCH means an index narrowed the lookup; any SCAN of the table visits every row
+    return [detail for detail in plan if detail == f'SCAN {table}' or detail.startswith(f'SCAN {table} ')]
+
+def temp_sorts(plan):
+    # The rows were sorted after reading them all, rather than read in index order
+    return [detail for detail in plan if detail.startswith('USE TEMP B-TREE FOR ORDER BY')]
@@ -0,0 +1,120 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+import multiprocessing
+import threading
+import time
+
+# Password hashing is deliberately slow, so it runs in a small process pool instead
+# of the request threads. The pool only accepts a bounded number of jobs; callers
+# get HashPoolBusy instead of queueing forever when a login burst arrives.
+
+class HashPoolBusy(Exception):
+    pass
+
+def method_prefix(method):
+    # The "method:params" prefix werkzeug writes for a method, with its defaults filled in, without hashing anything
+    name, *args = method.split(':')
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    if name == 'scrypt':
+        n, r, p = map(int, args) if args else (2 ** 15, 8, 1)
+        return f'scrypt:{n}:{r}:{p}'
+    return method
+
+class PasswordHasher:
+    def __init__(self, method='pbkdf2:sha256:600000', workers=2, queue_limit=8, timeout=10):
+        self.method = method
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max(workers, 1) + queue_limit)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._method_prefix = method_prefix(method)
+
+    def _get_executor(self):
+        # Created on first use so importing the app does not start processes
+        with self._executor_lock:
+            if self._executor is None:
+                # A child forked from the threaded server could inherit a lock another thread held at that moment;
+                # forkserver children start from a clean single-threaded process (spawn where there is no forkserver).
+                # They import the main module again, so it must start servers under `if __name__ == '__main__'` as app.py does
+                start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(start_method))
+            return self._executor
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashPoolBusy()
+        if not self.workers:
+            try:
+                return func(*args)
+            finally:
+                self._slots.release()
+
+        try:
+            future = self._get_executor().submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the job leaves the pool, not until the caller gives up on it
+        future.add_done_callback(lambda future: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # Drops the job if it has not started; a running one keeps its slot until it finishes
+            future.cancel()
+            raise HashPoolBusy()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, stored_hash, password):
+        return self._run(check_password_hash, stored_hash, password)
+
+    def needs_rehash(self, stored_hash):
+        # Compare the "method:params" part of the stored hash with the configured method's; one that cannot be parsed is replaced
+        try:
+            return method_prefix(stored_hash.split('$', 1)[0]) != self._method_prefix
+        except ValueError:
+            return True
+
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+class AttemptThrottle:
+    # Sliding-window attempt counter per key (an email address or a client IP)
+    def __init__(self, limit=10, window=60):
+        self.limit = limit
+        self.window = window
+        self._attempts = {}
+        self._lock = threading.Lock()
+        self._calls = 0
+
+    def hit(self, key):
+        # Record an attempt; returns 0 if allowed, else the seconds until the next attempt is
+        now = time.monotonic()
+        with self._lock:
+            self._calls += 1
+            if self._calls % 1000 == 0:
+                self._prune(now)
+            attempts = self._attempts.setdefault(key, deque())
+            while attempts and attempts[0] <= now - self.window:
+                attempts.popleft()
+            if len(attempts) >= self.limit:
+                return int(attempts[0] + self.window - now) + 1
+            attempts.append(now)
+            return 0
+
+    def reset(self, key):
+        with self._lock:
+            self._attempts.pop(key, None)
+
+    def _prune(self, now):
+        for key in [key for key, attempts in self._attempts.items() if not attempts or attempts[-1] <= now - self.window]:
+            del self._attempts[key]
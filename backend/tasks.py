@@ -0,0 +1,103 @@
+import logging
+import os
+import threading
+import time
+
+# Background task workers. Tasks are rows in the task table (see app.py), so any
+# process can queue them and any process can run them: web workers start a few
+# threads on their first request, and `flask worker` runs a dedicated process.
+# A task is claimed with a single conditional UPDATE, so two workers never run
+# the same one.
+
+logger = logging.getLogger(__name__)
+
+class TaskWorkers:
+    def __init__(self, run_next, maintain, threads=2, poll_interval=1.0, maintain_interval=60):
+        # run_next() runs one queued task and returns False when there was none
+        self.run_next = run_next
+        self.maintain = maintain
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.maintain_interval = maintain_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._pid = None
+        self._maintained_at = 0
+
+    def start(self):
+        # Threads do not survive a fork, so each process starts its own on first use
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            if not self.threads:
+                return
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._loop, name=f'task-worker-{number}', daemon=True)
+                for number in range(self.threads)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        with self._lock:
+            self._threads = []
+            self._pid = None
+
+    def run(self):
+        # Foreground mode for `flask worker`: returns when interrupted
+        self.start()
+        try:
+            while any(thread.is_alive() for thread in self._threads):
+                time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            ran = False
+            try:
+                self._maybe_maintain()
+                ran = self.run_next()
+            except Exception:
+                logger.exception('Task worker iteration failed')
+            if not ran:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def _maybe_maintain(self):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._maintained_at < self.maintain_interval:
+                return
+            self._maintained_at = now
+        self.maintain()
+
+class Progress:
+    # Callback handed to task code; writes the count of items done at most once per interval
+    def __init__(self, write, interval=1.0):
+        self.write = write
+        self.interval = interval
+        self.done = 0
+        self._written_at = 0
+
+    def __call__(self, done):
+        self.done = done
+        now = time.monotonic()
+        if now - self._written_at >= self.interval:
+            self._written_at = now
+            self.write(done)
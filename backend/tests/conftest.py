@@ -0,0 +1,48 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app, db, init_database
+
+@pytest.fixture
+def app(tmp_path):
+    # A scratch SQLite file per test; caching and background threads are off so every request hits the database
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'test.db'),
+        'CACHE_BACKEND': 'none',
+        'HASH_WORKERS': 0,
+        'TASK_WORKERS': 0,
+        'TASK_RESULT_DIR': str(tmp_path / 'task_results')
+    })
+    with app.app_context():
+        init_database()
+    return app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def auth_headers(app):
+    # auth_headers(user_id) -> request headers carrying an access token for that user
+    def headers(user_id):
+        with app.app_context():
+            return {'Authorization': 'Bearer ' + create_access_token(identity=user_id)}
+    return headers
+
+@pytest.fixture
+def count_queries(app):
+    # count_queries(func) -> number of SQL statements func() executed
+    with app.app_context():
+        engine = db.engine
+
+    def count(func):
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            func()
+        finally:
+            event.remove(engine, 'before_cursor_execute', listener)
+        return len(statements)
+    return count
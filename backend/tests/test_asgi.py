@@ -0,0 +1,43 @@
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from starlette.testclient import TestClient
+
+import asgi
+from benchmarks.datagen import generate
+
+@pytest.fixture
+def asgi_client(app, monkeypatch):
+    # The ASGI module serves the default app; point its engine and cache at the test app instead
+    engine = asgi.create_engine_for(app)
+    monkeypatch.setattr(asgi, 'engine', engine)
+    monkeypatch.setattr(asgi, 'Session', async_sessionmaker(engine, expire_on_commit=False))
+    monkeypatch.setattr(asgi, 'cache', app.extensions['response_cache'])
+    with TestClient(asgi.app) as client:
+        yield client
+
+# The async list routes run without a Flask app context and must answer like the Flask ones
+@pytest.mark.parametrize('query', [
+    'q=synthetic',
+    'q=campaign&sort=-budget&limit=5',
+    'q=synthetic&status=active,completed&platform=Email,Phone',
+    'tags=Tag+1,Tag+2&match=any&budget_min=5000&budget_max=15000',
+    'created_from=2024-03-01&created_to=2024-06-30&start_from=2024-02-01&end_to=2025-10-31&sort=-budget&limit=10',
+    'created_from=20240301&created_to=2024-06-30',
+    'budget_min=abc'
+])
+def test_asgi_search_and_filters_match_flask(app, client, asgi_client, query):
+    with app.app_context():
+        user_id = generate(users=2, campaigns_per_user=40)[1]
+
+    for path in ('/api/campaigns', f'/api/campaigns/user/{user_id}'):
+        expected = client.get(f'{path}?{query}')
+        response = asgi_client.get(f'{path}?{query}')
+        assert response.status_code == expected.status_code
+        assert response.json() == expected.get_json()
+        assert expected.status_code == 400 or expected.get_json()['campaigns']
+
+@pytest.mark.parametrize('query', ['created_from=zzz', 'created_to=2024-13-01', 'start_from=2024-02-30', 'end_to=01/02/2024', 'budget_min=abc'])
+def test_invalid_range_filter_is_rejected(client, asgi_client, query):
+    for path in ('/api/campaigns', '/api/campaigns/user/1'):
+        assert client.get(f'{path}?{query}').status_code == 400
+        assert asgi_client.get(f'{path}?{query}').status_code == 400
@@ -0,0 +1,96 @@
+import pytest
+
+from app import Campaign, db
+from benchmarks.datagen import generate
+
+@pytest.fixture
+def owners(app):
+    # Two regular users with 10 campaigns each
+    with app.app_context():
+        return generate(users=2, campaigns_per_user=10)
+
+def campaigns(app, owner_id):
+    with app.app_context():
+        return {row.id: row for row in db.session.execute(
+            db.select(Campaign.id, Campaign.status, Campaign.leads_count, Campaign.responses_count).where(Campaign.owner_id == owner_id)
+        )}
+
+def test_patch_by_ids_reports_every_id(app, client, auth_headers, owners):
+    user_id, other_id = owners
+    mine, theirs = sorted(campaigns(app, user_id)), sorted(campaigns(app, other_id))
+    response = client.patch('/api/campaigns', json={'ids': [mine[0], theirs[0], 999999, mine[1]], 'changes': {'leads_count': 40, 'responses_count': 10}}, headers=auth_headers(user_id))
+
+    assert response.status_code == 200
+    assert response.get_json()['updated'] == 2
+    assert response.get_json()['results'] == [
+        {'id': str(mine[0]), 'status': 'updated'},
+        {'id': str(theirs[0]), 'status': 'unauthorized'},
+        {'id': '999999', 'status': 'not_found'},
+        {'id': str(mine[1]), 'status': 'updated'}
+    ]
+    assert {campaign_id for campaign_id, row in campaigns(app, user_id).items() if row.leads_count == 40} == {mine[0], mine[1]}
+    assert campaigns(app, other_id)[theirs[0]].leads_count != 40
+
+def test_patch_by_filter_only_reaches_allowed_owners(app, client, auth_headers, owners):
+    user_id, other_id = owners
+    response = client.patch('/api/campaigns', json={'filter': {'status': ['active', 'completed']}, 'changes': {'status': 'draft'}}, headers=auth_headers(user_id))
+    assert response.status_code == 200
+    assert all(row.status == 'draft' for row in campaigns(app, user_id).values())
+    assert any(row.status != 'draft' for row in campaigns(app, other_id).values())
+
+    # Admins reach any owner, here the one named by owner
+    active = [campaign_id for campaign_id, row in campaigns(app, other_id).items() if row.status == 'active']
+    response = client.patch('/api/campaigns', json={'filter': {'owner': other_id, 'status': 'active'}, 'changes': {'status': 'completed'}}, headers=auth_headers(1))
+    assert response.status_code == 200
+    assert sorted(int(result['id']) for result in response.get_json()['results']) == sorted(active)
+    assert all(row.status != 'active' for row in campaigns(app, other_id).values())
+
+def test_delete_by_ids_and_filter(app, client, auth_headers, owners):
+    user_id, other_id = owners
+    mine, theirs = sorted(campaigns(app, user_id)), sorted(campaigns(app, other_id))
+
+    response = client.delete('/api/campaigns', json={'ids': [mine[0], theirs[0]]}, headers=auth_headers(user_id))
+    assert response.get_json()['results'] == [{'id': str(mine[0]), 'status': 'deleted'}, {'id': str(theirs[0]), 'status': 'unauthorized'}]
+    assert mine[0] not in campaigns(app, user_id) and theirs[0] in campaigns(app, other_id)
+
+    response = client.delete('/api/campaigns', json={'filter': {'platform': ['LinkedIn', 'Email', 'Twitter', 'Facebook', 'Instagram', 'Phone', 'In Person', 'Other']}}, headers=auth_headers(user_id))
+    assert response.get_json()['deleted'] == len(mine) - 1
+    assert campaigns(app, user_id) == {} and len(campaigns(app, other_id)) == len(theirs)
+
+@pytest.mark.parametrize('body, message', [
+    ({'changes': {'leads_count': -1}}, 'leads_count and responses_count cannot be negative'),
+    ({'changes': {'responses_count': 3.7}}, 'leads_count and responses_count must be whole numbers'),
+    ({'changes': {'leads_count': 'many'}}, 'leads_count must be a number'),
+    ({'changes': {'leads_count': True}}, 'leads_count must be a number'),
+    ({'changes': {'budget': None}}, 'budget cannot be null'),
+    ({'changes': {'tags': 5}}, 'tags must be a list or a comma-separated string'),
+    ({'changes': {'owner_id': 2}}, 'Unknown fields: owner_id'),
+    ({'changes': {}}, 'changes must be a non-empty object'),
+    ({'changes': {'status': 'draft'}, 'filter': {'created_from': 'zzz'}}, 'created_from must be a YYYY-MM-DD date'),
+    ({'changes': {'status': 'draft'}, 'filter': {'owner_id': 2}}, 'Unknown filters: owner_id'),
+    ({'changes': {'status': 'draft'}, 'ids': []}, 'ids must be a non-empty list'),
+    ({'changes': {'status': 'draft'}, 'ids': [1], 'filter': {'status': 'active'}}, 'Pass either ids or filter')
+])
+def test_invalid_patch_changes_nothing(app, client, auth_headers, owners, body, message):
+    user_id = owners[0]
+    before = campaigns(app, user_id)
+    if 'ids' not in body and 'filter' not in body:
+        body = dict(body, ids=sorted(before)[:3])
+
+    response = client.patch('/api/campaigns', json=body, headers=auth_headers(user_id))
+    assert response.status_code == 400
+    assert response.get_json()['message'] == message
+    assert campaigns(app, user_id) == before
+
+def test_bulk_import_rejects_counts_like_patch(client, auth_headers):
+    row = {
+        'name': 'Launch', 'description': 'd', 'target_audience': 't', 'platform': 'Email', 'budget': 100,
+        'start_date': '2024-01-01', 'end_date': '2024-12-31', 'status': 'active'
+    }
+    rows = [dict(row, leads_count=3.7), dict(row, responses_count=-2), dict(row, leads_count='12', responses_count=3.0)]
+    summary = client.post('/api/campaigns/bulk', json=rows, headers=auth_headers(1)).get_json()
+    assert summary['inserted'] == 1
+    assert summary['errors'] == [
+        {'row': 1, 'message': 'leads_count and responses_count must be whole numbers'},
+        {'row': 2, 'message': 'leads_count and responses_count cannot be negative'}
+    ]
@@ -0,0 +1,51 @@
+from app import Campaign, CampaignMetricEvent, check_campaign_stats, db, load_campaign_tags
+
+CAMPAIGN = {
+    'name': 'Launch', 'description': 'd', 'target_audience': 't', 'platform': 'Email', 'budget': 100,
+    'start_date': '2024-01-01', 'end_date': '2024-12-31', 'status': 'active', 'leads_count': 10, 'responses_count': 2
+}
+
+def bulk(client, headers, rows, mode='upsert'):
+    response = client.post(f'/api/campaigns/bulk?mode={mode}', json=rows, headers=headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+def campaign(app, campaign_id):
+    campaign_id = int(campaign_id)
+    with app.app_context():
+        row = db.session.get(Campaign, campaign_id)
+        return row and {'name': row.name, 'leads_count': row.leads_count, 'tags': load_campaign_tags([campaign_id]).get(campaign_id, [])}
+
+def test_upsert_keeps_tags_unless_the_row_has_them(app, client, auth_headers):
+    headers = auth_headers(1)
+    campaign_id = client.post('/api/campaigns', json=dict(CAMPAIGN, tags=['B2B', 'Tech']), headers=headers).get_json()['campaign']['id']
+
+    assert bulk(client, headers, [dict(CAMPAIGN, id=campaign_id, name='Renamed')])['updated'] == 1
+    assert campaign(app, campaign_id) == {'name': 'Renamed', 'leads_count': 10, 'tags': ['B2B', 'Tech']}
+    bulk(client, headers, [dict(CAMPAIGN, id=campaign_id, tags=[])])
+    assert campaign(app, campaign_id)['tags'] == []
+
+def test_upsert_inserts_unknown_ids(app, client, auth_headers):
+    headers = auth_headers(1)
+    summary = bulk(client, headers, [dict(CAMPAIGN, id=500, tags='Restored'), dict(CAMPAIGN, name='New')])
+    assert (summary['inserted'], summary['updated'], summary['errors']) == (2, 0, [])
+    assert campaign(app, 500) == {'name': 'Launch', 'leads_count': 10, 'tags': ['Restored']}
+
+    # Later inserts continue after the restored id
+    assert int(client.post('/api/campaigns', json=CAMPAIGN, headers=headers).get_json()['campaign']['id']) > 500
+    assert bulk(client, headers, [dict(CAMPAIGN, id=501)], mode='insert')['errors'] == [{'row': 1, 'message': 'id is only accepted with mode=upsert'}]
+
+def test_repeated_id_in_one_batch_applies_its_last_row_once(app, client, auth_headers):
+    headers = auth_headers(1)
+    campaign_id = client.post('/api/campaigns', json=CAMPAIGN, headers=headers).get_json()['campaign']['id']
+
+    summary = bulk(client, headers, [
+        dict(CAMPAIGN, id=campaign_id, leads_count=30, tags=['First']),
+        dict(CAMPAIGN, id=campaign_id, leads_count=50, name='Last')
+    ])
+    assert (summary['inserted'], summary['updated'], summary['errors']) == (0, 1, [])
+    assert campaign(app, campaign_id) == {'name': 'Last', 'leads_count': 50, 'tags': ['First']}
+    with app.app_context():
+        assert check_campaign_stats() == []
+        deltas = db.session.scalars(db.select(CampaignMetricEvent.leads_delta).where(CampaignMetricEvent.campaign_id == int(campaign_id))).all()
+    assert sum(deltas) == 50
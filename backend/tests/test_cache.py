@@ -0,0 +1,31 @@
+from cache import LRUCache, create_cache
+
+def test_memory_cache_evicts_least_recently_used_by_size():
+    cache = LRUCache(maxsize=10, maxbytes=100)
+    for key in 'abc':
+        cache.set(key, b'x' * 30)
+    cache.get('a')
+    cache.set('d', b'x' * 30)
+
+    assert [key for key in 'abcd' if cache.get(key) is not None] == ['a', 'c', 'd']
+    assert (cache.stats()['bytes'], cache.stats()['evictions']) == (90, 1)
+
+def test_memory_cache_byte_count_follows_every_removal():
+    cache = LRUCache(maxsize=2, maxbytes=1000)
+    cache.set('campaigns:1', b'x' * 10)
+    cache.set('campaigns:1', b'x' * 40)
+    cache.set('stats:1', b'x' * 20)
+    assert cache.stats()['bytes'] == 60
+    cache.set('campaigns:2', b'x' * 5)  # over the entry count
+    assert cache.stats()['bytes'] == 25
+    cache.delete_prefix('campaigns:')
+    assert cache.stats()['bytes'] == 20
+    cache.clear()
+    assert cache.stats()['bytes'] == 0
+
+def test_body_larger_than_the_budget_is_not_cached():
+    cache = create_cache({'CACHE_BACKEND': 'memory', 'CACHE_MAX_BYTES': 50})
+    cache.set('small', b'x' * 20)
+    cache.set('huge', b'x' * 51)
+    assert cache.get('huge') is None and cache.get('small') is not None
+    assert cache.stats()['bytes'] == 20
@@ -0,0 +1,63 @@
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import Campaign, db, load_campaign_tags
+from benchmarks.datagen import generate
+
+# The list endpoints must run the same number of queries whatever the number of campaigns
+@pytest.mark.parametrize('path', [
+    '/api/campaigns',
+    '/api/campaigns?limit=100',
+    '/api/campaigns/user/{user_id}',
+    '/api/campaigns/user/{user_id}?limit=100'
+])
+def test_campaign_list_queries_do_not_grow_with_campaigns(app, client, count_queries, path):
+    with app.app_context():
+        small_user = generate(users=1, campaigns_per_user=5)[0]
+    client.get('/api/campaigns')
+
+    def get(user_id):
+        response = client.get(path.format(user_id=user_id))
+        assert response.status_code == 200
+        return response.get_json()['campaigns']
+
+    small_campaigns = []
+    small_count = count_queries(lambda: small_campaigns.extend(get(small_user)))
+
+    with app.app_context():
+        large_user = generate(users=1, campaigns_per_user=300, seed=1)[0]
+    large_campaigns = []
+    large_count = count_queries(lambda: large_campaigns.extend(get(large_user)))
+
+    assert len(large_campaigns) > len(small_campaigns)
+    assert all(campaign['tags'] for campaign in large_campaigns)
+    assert large_count == small_count
+
+# A bulk import writes all new campaigns with one INSERT, also when only some rows have a conversion rate
+def test_bulk_import_statements_do_not_grow_with_rows(app, client, count_queries):
+    with app.app_context():
+        headers = {'Authorization': 'Bearer ' + create_access_token(identity=1)}
+
+    def rows(count, offset):
+        return [{
+            'name': f'Bulk {offset + i}', 'description': 'd', 'target_audience': 't', 'platform': 'Email', 'budget': 1,
+            'start_date': '2024-01-01', 'end_date': '2024-12-31', 'status': 'active',
+            'leads_count': (i % 3) * 10, 'responses_count': i % 2, 'tags': [f'tag{(offset + i) % 4}']
+        } for i in range(count)]
+
+    def post(count, offset):
+        response = client.post('/api/campaigns/bulk', json=rows(count, offset), headers=headers)
+        assert response.status_code == 200
+        assert response.get_json()['inserted'] == count
+
+    # The first import also creates the tags
+    post(4, 205)
+    small_count = count_queries(lambda: post(5, 0))
+    large_count = count_queries(lambda: post(200, 5))
+    assert large_count == small_count
+
+    with app.app_context():
+        campaigns = db.session.execute(db.select(Campaign.id, Campaign.name)).all()
+        tags = load_campaign_tags([campaign.id for campaign in campaigns])
+    assert len(campaigns) == 209
+    assert all(tags[campaign.id] == [f'tag{int(campaign.name.split()[1]) % 4}'] for campaign in campaigns)
@@ -0,0 +1,81 @@
+from datetime import date, timedelta
+
+from app import Campaign, CampaignMetricRollup, check_campaign_stats, db
+from benchmarks.datagen import generate
+from timeseries import rebuild_rollups
+
+CAMPAIGN = {
+    'name': 'Launch', 'description': 'd', 'target_audience': 't', 'platform': 'Email', 'budget': 100,
+    'start_date': '2024-01-01', 'end_date': '2024-12-31', 'status': 'active', 'leads_count': 10, 'responses_count': 2
+}
+
+def owned_ids(app, owner_id):
+    with app.app_context():
+        return db.session.scalars(db.select(Campaign.id).where(Campaign.owner_id == owner_id).order_by(Campaign.id)).all()
+
+def rollup_table(app):
+    with app.app_context():
+        rows = db.session.execute(db.select(
+            CampaignMetricRollup.scope, CampaignMetricRollup.scope_id, CampaignMetricRollup.period, CampaignMetricRollup.bucket,
+            CampaignMetricRollup.leads, CampaignMetricRollup.responses, CampaignMetricRollup.events
+        )).all()
+    return sorted(tuple(row) for row in rows)
+
+# Every kind of campaign write maintains the stats snapshot in place; check_campaign_stats compares it with the campaign table
+def test_every_write_keeps_stats_snapshot_consistent(app, client, auth_headers):
+    with app.app_context():
+        user_id, other_id = generate(users=2, campaigns_per_user=20)
+    user, admin = auth_headers(user_id), auth_headers(1)
+
+    def assert_consistent(response, status=200):
+        assert response.status_code == status, response.get_json()
+        with app.app_context():
+            assert check_campaign_stats() == []
+
+    created = client.post('/api/campaigns', json=CAMPAIGN, headers=user)
+    assert_consistent(created, 201)
+    campaign_id = created.get_json()['campaign']['id']
+    assert_consistent(client.put(f'/api/campaigns/{campaign_id}', json={'status': 'completed', 'platform': 'Phone', 'leads_count': 40}, headers=user))
+    assert_consistent(client.put(f'/api/campaigns/{campaign_id}', json={'leads_count': 0, 'responses_count': 0}, headers=user))
+    assert_consistent(client.delete(f'/api/campaigns/{campaign_id}', headers=user))
+
+    # An admin changing someone else's campaign updates that owner's snapshot
+    other_campaign = owned_ids(app, other_id)[0]
+    assert_consistent(client.put(f'/api/campaigns/{other_campaign}', json={'status': 'draft', 'budget': 5}, headers=admin))
+
+    ids = owned_ids(app, user_id)
+    assert_consistent(client.patch('/api/campaigns', json={'ids': ids[:5], 'changes': {'status': 'completed', 'leads_count': 7}}, headers=user))
+    assert_consistent(client.patch('/api/campaigns', json={'filter': {'status': 'active'}, 'changes': {'platform': 'Other', 'responses_count': 3}}, headers=user))
+    assert_consistent(client.patch('/api/campaigns', json={'filter': {'platform': 'Other'}, 'changes': {'status': 'draft'}}, headers=admin))
+    assert_consistent(client.delete('/api/campaigns', json={'ids': ids[:3]}, headers=user))
+    assert_consistent(client.delete('/api/campaigns', json={'filter': {'owner': other_id, 'status': 'completed'}}, headers=admin))
+
+    rows = [dict(CAMPAIGN, name=f'Bulk {i}', leads_count=i, responses_count=i // 2, status=['active', 'draft'][i % 2]) for i in range(30)]
+    assert_consistent(client.post('/api/campaigns/bulk', json=rows, headers=user))
+    updates = [dict(CAMPAIGN, id=campaign_id, leads_count=100, status='completed') for campaign_id in owned_ids(app, user_id)[-10:]]
+    assert_consistent(client.post('/api/campaigns/bulk?mode=upsert', json=updates, headers=user))
+
+# The day and week rollups hold the sums of the metric events, as a rebuild from the event log computes them
+def test_metric_rollups_match_the_event_log(app, client, auth_headers):
+    with app.app_context():
+        user_id = generate(users=1, campaigns_per_user=10)[0]
+    user = auth_headers(user_id)
+
+    campaign_id = client.post('/api/campaigns', json=CAMPAIGN, headers=user).get_json()['campaign']['id']
+    client.put(f'/api/campaigns/{campaign_id}', json={'leads_count': 25, 'responses_count': 5}, headers=user)
+    ids = owned_ids(app, user_id)
+    client.patch('/api/campaigns', json={'ids': ids[:4], 'changes': {'leads_count': 3}}, headers=user)
+    client.post('/api/campaigns/bulk', json=[dict(CAMPAIGN, name=f'Bulk {i}', leads_count=i) for i in range(5)], headers=user)
+
+    maintained = rollup_table(app)
+    with app.app_context():
+        rebuild_rollups(db.session.connection())
+        db.session.commit()
+    assert rollup_table(app) == maintained
+
+    # The campaign's history today is its opening counters plus the update; the week bucket starts on Monday
+    today = date.today()
+    day = client.get(f'/api/campaigns/{campaign_id}/timeseries?period=day&from={today}&to={today}').get_json()
+    assert day['points'] == [{'date': today.isoformat(), 'leads': 25, 'responses': 5, 'events': 2}]
+    week = client.get(f'/api/campaigns/{campaign_id}/timeseries?period=week&from={today}&to={today}').get_json()
+    assert week['points'] == [{'date': (today - timedelta(days=today.weekday())).isoformat(), 'leads': 25, 'responses': 5, 'events': 2}]
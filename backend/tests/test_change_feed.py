@@ -0,0 +1,119 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from app import CampaignChange, db
+from benchmarks.datagen import generate
+from changefeed import ChangeHub, ChangeNotifier
+
+CAMPAIGN = {
+    'name': 'Launch', 'description': 'd', 'target_audience': 't', 'platform': 'Email', 'budget': 100,
+    'start_date': '2024-01-01', 'end_date': '2024-12-31', 'status': 'active'
+}
+
+def create(client, headers, **fields):
+    return client.post('/api/campaigns', json=dict(CAMPAIGN, **fields), headers=headers).get_json()['campaign']['id']
+
+def logged_changes(app):
+    with app.app_context():
+        return [(row.campaign_id, row.owner_id, row.action, row.public) for row in db.session.execute(
+            db.select(CampaignChange.campaign_id, CampaignChange.owner_id, CampaignChange.action, CampaignChange.public)
+            .order_by(CampaignChange.id)
+        )]
+
+def read_feed(client, last_event_id=None, user_id=None):
+    # (event type, id, data) for each message of one poll of the feed
+    headers = {'Last-Event-ID': str(last_event_id)} if last_event_id is not None else {}
+    response = client.get('/api/campaigns/changes' + (f'?user={user_id}' if user_id else ''), headers=headers)
+    assert response.status_code == 200
+    events = []
+    for message in response.get_data(as_text=True).split('\n\n')[:-1]:
+        fields = dict(line.split(': ', 1) for line in message.split('\n'))
+        if 'id' in fields:
+            events.append((fields.get('event', 'message'), int(fields['id']), json.loads(fields['data']) if 'data' in fields else None))
+    return events
+
+def test_every_write_logs_its_changes(app, client, auth_headers):
+    headers = auth_headers(1)
+    created, draft = create(client, headers), create(client, headers, status='draft')
+    client.put(f'/api/campaigns/{created}', json={'status': 'draft'}, headers=headers)
+    client.patch('/api/campaigns', json={'ids': [draft], 'changes': {'leads_count': 5}}, headers=headers)
+    client.delete(f'/api/campaigns/{draft}', headers=headers)
+    client.post('/api/campaigns/bulk', json=[dict(CAMPAIGN, name='Imported')], headers=headers)
+    client.delete('/api/campaigns', json={'ids': [created]}, headers=headers)
+
+    changes = logged_changes(app)
+    created, draft = int(created), int(draft)
+    imported = changes[5][0]
+    # A campaign turning draft is still public once so the global feed sees it leave
+    assert changes == [
+        (created, 1, 'created', True),
+        (draft, 1, 'created', False),
+        (created, 1, 'updated', True),
+        (draft, 1, 'updated', False),
+        (draft, 1, 'deleted', False),
+        (imported, 1, 'created', True),
+        (created, 1, 'deleted', False)
+    ]
+
+def test_resume_replays_only_later_changes(app, client, auth_headers):
+    headers = auth_headers(1)
+    ids = [create(client, headers, name=f'Launch {i}') for i in range(3)]
+    draft = create(client, headers, status='draft')
+
+    # A fresh client only learns the position
+    (_, newest, data), = read_feed(client)
+    assert data is None
+    first = newest - 3
+
+    events = read_feed(client, first)
+    assert [(event, data and data['campaign_id']) for event, _, data in events] == [('message', ids[1]), ('message', ids[2]), ('message', None)]
+    assert [event_id for _, event_id, _ in events] == [first + 1, first + 2, newest]
+    # Drafts only reach their owner's feed
+    assert [data['campaign_id'] for _, _, data in read_feed(client, first, user_id=1) if data] == ids[1:] + [draft]
+    assert read_feed(client, newest) == [('message', newest, None)]
+
+def test_patch_larger_than_the_log_resets_resuming_clients(app, client, auth_headers):
+    app.config['CHANGE_LOG_SIZE'] = 5
+    with app.app_context():
+        user_id = generate(users=1, campaigns_per_user=10)[0]
+    headers = auth_headers(user_id)
+    create(client, headers)
+    (_, position, _), = read_feed(client)
+
+    # One PATCH logs 11 changes and prunes all but the last 5, including its own first ones
+    response = client.patch('/api/campaigns', json={'filter': {'owner': user_id}, 'changes': {'leads_count': 7}}, headers=headers)
+    assert response.get_json()['updated'] == 11
+    assert len(logged_changes(app)) == 5
+
+    for user in (None, user_id):
+        assert read_feed(client, position, user) == [('reset', position + 11, {'last_event_id': str(position + 11)})]
+    # From the reset position on it resumes normally
+    campaign_id = create(client, headers)
+    assert [(event, data and data['campaign_id']) for event, _, data in read_feed(client, position + 11)] == [('message', campaign_id), ('message', None)]
+
+def test_hub_drops_streams_when_changes_were_pruned_before_it_read_them():
+    log = {'oldest': None, 'rows': []}
+
+    async def fetch(after):
+        return log['oldest'], [row for row in log['rows'] if row.id > after]
+
+    async def newest():
+        return 3
+
+    async def run():
+        hub = ChangeHub(fetch, newest, ChangeNotifier())
+        await hub._load_position()
+        subscription = hub.subscribe(lambda row: True)
+
+        log['oldest'], log['rows'] = 4, [SimpleNamespace(id=i) for i in (4, 5)]
+        await hub.poll()
+        assert not subscription.overflowed and [row.id for row in subscription.pending] == [4, 5]
+
+        # Ids 6 to 9 were logged and pruned by one write before this poll
+        log['oldest'], log['rows'] = 10, [SimpleNamespace(id=i) for i in (10, 11)]
+        await hub.poll()
+        assert subscription.overflowed and subscription.ready.is_set()
+        assert hub.position == 11
+
+    asyncio.run(run())
@@ -0,0 +1,51 @@
+from flask_jwt_extended import create_access_token
+
+from app import create_app, init_database, rebuild_all_campaign_stats
+
+CAMPAIGN = {
+    'name': 'Launch', 'description': 'd', 'target_audience': 't', 'platform': 'Email', 'budget': 100,
+    'start_date': '2024-01-01', 'end_date': '2024-12-31', 'status': 'active', 'leads_count': 10, 'responses_count': 1
+}
+
+def worker(path):
+    # One process of a multi-worker deployment: its own in-memory response cache on the shared database
+    return create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + path, 'CACHE_BACKEND': 'memory', 'HASH_WORKERS': 0, 'TASK_WORKERS': 0})
+
+def test_cached_body_always_matches_its_etag_across_workers(tmp_path):
+    first, second = worker(str(tmp_path / 'test.db')), worker(str(tmp_path / 'test.db'))
+    with first.app_context():
+        init_database()
+        headers = {'Authorization': 'Bearer ' + create_access_token(identity=1)}
+    first_client, second_client = first.test_client(), second.test_client()
+
+    for path in ('/api/campaigns', '/api/campaigns/user/1', '/api/campaigns/stats/1'):
+        # Both workers cache the empty state, then only the first sees the write
+        for client in (first_client, second_client):
+            client.get(path)
+        first_client.post('/api/campaigns', json=CAMPAIGN, headers=headers)
+
+        response = second_client.get(path)
+        fresh = first_client.get(path)
+        assert response.get_data() == fresh.get_data()
+        assert response.headers['ETag'] == fresh.headers['ETag']
+        assert first_client.get(path, headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+def test_user_scope_ignores_leading_zeros(client, app):
+    with app.app_context():
+        headers = {'Authorization': 'Bearer ' + create_access_token(identity=1)}
+    etag = client.get('/api/campaigns/user/01').headers['ETag']
+    client.post('/api/campaigns', json=CAMPAIGN, headers=headers)
+
+    response = client.get('/api/campaigns/user/01', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert len(response.get_json()['campaigns']) == 1
+
+def test_full_stats_rebuild_moves_data_versions(client, app):
+    with app.app_context():
+        headers = {'Authorization': 'Bearer ' + create_access_token(identity=1)}
+    client.post('/api/campaigns', json=CAMPAIGN, headers=headers)
+    etag = client.get('/api/campaigns/stats/1').headers['ETag']
+
+    with app.app_context():
+        rebuild_all_campaign_stats()
+    assert client.get('/api/campaigns/stats/1', headers={'If-None-Match': etag}).status_code == 200
@@ -0,0 +1,26 @@
+import base64
+import json
+
+import pytest
+
+def encode(position):
+    return base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+
+# Cursors come back from clients, so a tampered one is a bad request rather than a database error
+@pytest.mark.parametrize('query', [
+    'sort=budget&cursor=' + encode(['budget', False, {'a': 1}, 2]),
+    'sort=budget&cursor=' + encode(['budget', False, [1], 2]),
+    'sort=budget&cursor=' + encode(['budget', False, True, 2]),
+    'sort=budget&cursor=' + encode(['budget', False, 10 ** 30, 2]),
+    'sort=budget&cursor=' + encode(['budget', False, 1.5, 10 ** 30]),
+    'sort=budget&cursor=' + encode(['budget', False, 1.5, '2']),
+    'cursor=' + str(10 ** 30)
+])
+@pytest.mark.parametrize('path', ['/api/campaigns', '/api/campaigns/user/1'])
+def test_tampered_cursor_is_rejected(client, path, query):
+    assert client.get(f'{path}?limit=5&{query}').status_code == 400
+
+@pytest.mark.parametrize('position', [['budget', False, 1.5, 2], ['budget', False, None, 2], ['budget', True, 10, 2]])
+def test_scalar_cursor_is_accepted(client, position):
+    sort = '-budget' if position[1] else 'budget'
+    assert client.get(f'/api/campaigns?limit=5&sort={sort}&cursor={encode(position)}').status_code == 200
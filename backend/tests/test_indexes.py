@@ -0,0 +1,11 @@
+from app import check_hot_queries, db
+from benchmarks.datagen import generate
+
+def test_hot_campaign_queries_use_indexes(app):
+    with app.app_context():
+        generate(users=2, campaigns_per_user=50)
+        with db.engine.connect() as conn:
+            results = check_hot_queries(conn)
+
+    problems = {name: plan for name, (plan, found) in results.items() if found}
+    assert problems == {}
@@ -0,0 +1,26 @@
+import pytest
+from werkzeug.security import generate_password_hash
+
+import passwords
+from passwords import PasswordHasher, method_prefix
+
+@pytest.mark.parametrize('method', ['pbkdf2', 'pbkdf2:sha512', 'pbkdf2:sha256:1000', 'scrypt', 'scrypt:16384:8:1'])
+def test_method_prefix_matches_werkzeug(method):
+    assert method_prefix(method) == generate_password_hash('secret', method).split('$', 1)[0]
+
+def test_needs_rehash_does_not_hash(monkeypatch):
+    hasher = PasswordHasher(method='pbkdf2:sha256:1000', workers=0)
+    current, old = generate_password_hash('secret', 'pbkdf2:sha256:1000'), generate_password_hash('secret', 'pbkdf2:sha256:500')
+    monkeypatch.setattr(passwords, 'generate_password_hash', lambda *args: pytest.fail('needs_rehash computed a hash'))
+    assert not hasher.needs_rehash(current)
+    assert hasher.needs_rehash(old)
+    assert hasher.needs_rehash('not a hash')
+
+def test_pool_hashes_in_fresh_processes():
+    hasher = PasswordHasher(method='pbkdf2:sha256:1000', workers=1)
+    try:
+        stored = hasher.hash('secret')
+        assert hasher.verify(stored, 'secret') and not hasher.verify(stored, 'other')
+        assert hasher._executor._mp_context.get_start_method() in ('forkserver', 'spawn')
+    finally:
+        hasher.shutdown()
@@ -0,0 +1,113 @@
+import json
+import os
+
+from app import TASK_HANDLERS, Task, claim_task, db, expire_tasks, queue_task, run_next_task, task_timestamp
+from benchmarks.datagen import generate
+from tasks import TaskWorkers
+
+def task_status(client, headers, task_id):
+    response = client.get(f'/api/tasks/{task_id}', headers=headers)
+    assert response.status_code == 200
+    return response.get_json()['task']
+
+def test_export_task_runs_to_done(app, client, auth_headers):
+    with app.app_context():
+        user_id = generate(users=1, campaigns_per_user=20)[0]
+    headers = auth_headers(user_id)
+
+    response = client.get('/api/campaigns/export?format=csv&fields=name,status&async=1', headers=headers)
+    assert response.status_code == 202
+    task_id = response.get_json()['task']['id']
+    assert task_status(client, headers, task_id)['status'] == 'queued'
+    assert client.get(f'/api/tasks/{task_id}/result', headers=headers).status_code == 409
+
+    assert run_next_task(app)
+    assert not run_next_task(app)
+    task = task_status(client, headers, task_id)
+    assert (task['status'], task['progress'], task['total']) == ('done', 20, 20)
+    lines = client.get(f'/api/tasks/{task_id}/result', headers=headers).get_data(as_text=True).splitlines()
+    assert lines[0] == 'name,status' and len(lines) == 21
+
+def test_bulk_import_task_reports_its_summary(app, client, auth_headers):
+    headers = auth_headers(1)
+    rows = [
+        {'name': f'Imported {i}', 'description': 'd', 'target_audience': 't', 'platform': 'Email', 'budget': 10,
+         'start_date': '2024-01-01', 'end_date': '2024-12-31', 'status': 'active'}
+        for i in range(3)
+    ]
+    body = '\n'.join(json.dumps(row) for row in rows[:2]) + '\n{"name": "broken"}\n'
+    response = client.post('/api/campaigns/bulk?async=1', data=body, content_type='application/x-ndjson', headers=headers)
+    assert response.status_code == 202
+    task_id = response.get_json()['task']['id']
+
+    assert run_next_task(app)
+    assert task_status(client, headers, task_id)['status'] == 'done'
+    result = client.get(f'/api/tasks/{task_id}/result', headers=headers).get_json()['result']
+    assert (result['inserted'], len(result['errors'])) == (2, 1)
+    assert not [name for name in os.listdir(app.config['TASK_RESULT_DIR']) if name.startswith(task_id)]
+
+def test_failing_tasks_end_failed(app, client, auth_headers, monkeypatch):
+    def explode(task, params, progress):
+        raise RuntimeError('disk on fire')
+    monkeypatch.setitem(TASK_HANDLERS, 'explode', explode)
+
+    upload = os.path.join(app.config['TASK_RESULT_DIR'], 'missing-user.upload')
+    os.makedirs(os.path.dirname(upload), exist_ok=True)
+    with open(upload, 'w') as f:
+        f.write('[]')
+    with app.app_context():
+        # Bad input is reported as is; anything else only by its exception type
+        bad_input = queue_task('bulk-import', 1, {'mode': 'insert', 'content_type': 'application/json', 'upload': upload}).id
+        crash = queue_task('explode', 1, {}).id
+        db.session.execute(db.update(Task).where(Task.id == bad_input).values(owner_id=999))
+        db.session.commit()
+
+    assert run_next_task(app) and run_next_task(app)
+    headers = auth_headers(1)
+    crashed = task_status(client, headers, crash)
+    assert (crashed['status'], crashed['error']) == ('failed', 'Task failed: RuntimeError')
+    assert client.get(f'/api/tasks/{crash}/result', headers=headers).status_code == 409
+    with app.app_context():
+        task = db.session.get(Task, bad_input)
+        assert (task.status, task.error) == ('failed', 'User not found')
+    assert not os.path.exists(upload)
+
+def test_claim_takes_each_queued_task_once_oldest_first(app):
+    with app.app_context():
+        first, second = queue_task('explode', 1, {}).id, queue_task('explode', 1, {}).id
+        db.session.execute(db.update(Task).where(Task.id == second).values(created_at=task_timestamp(-60)))
+        db.session.commit()
+
+        assert claim_task().id == second
+        assert claim_task().id == first
+        assert claim_task() is None
+        assert set(db.session.scalars(db.select(Task.status))) == {'running'}
+
+def test_expire_tasks_fails_stalled_and_deletes_expired(app):
+    with app.app_context():
+        stalled, expired = queue_task('explode', 1, {}).id, queue_task('explode', 1, {}).id
+        db.session.execute(db.update(Task).where(Task.id == stalled).values(status='running', updated_at=task_timestamp(-3600)))
+        db.session.execute(db.update(Task).where(Task.id == expired).values(status='done', expires_at=task_timestamp(-1)))
+        db.session.commit()
+    result_file = os.path.join(app.config['TASK_RESULT_DIR'], expired + '.csv')
+    os.makedirs(os.path.dirname(result_file), exist_ok=True)
+    open(result_file, 'w').close()
+
+    expire_tasks(app)
+    with app.app_context():
+        task = db.session.get(Task, stalled)
+        assert (task.status, task.error) == ('failed', 'Task stopped reporting progress')
+        assert db.session.get(Task, expired) is None
+    assert not os.path.exists(result_file)
+
+def test_worker_command_runs_queued_tasks(app, monkeypatch):
+    # The command runs until interrupted; here its workers stop once the queue is empty
+    monkeypatch.setattr(TaskWorkers, 'run', lambda self: [None for _ in iter(self.run_next, False)])
+    with app.app_context():
+        task_id = queue_task('rebuild-stats', 1, {}).id
+
+    result = app.test_cli_runner().invoke(args=['worker', '--threads', '1'])
+    assert result.exit_code == 0, result.output
+    with app.app_context():
+        task = db.session.get(Task, task_id)
+        assert task.status == 'done' and json.loads(task.result) == {'rows': 0}
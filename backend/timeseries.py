@@ -0,0 +1,77 @@
+from datetime import date, datetime, timedelta
+from sqlalchemy import text
+
+# Leads/responses history. Every change to a campaign's counters is appended to
+# campaign_metric_event and added to campaign_metric_rollup, which holds the
+# per-day and per-week sums for each campaign, user and platform. Range queries
+# read the rollups only.
+
+PERIODS = ('day', 'week')
+
+def bucket_start(day, period):
+    # Weeks start on Monday
+    return day - timedelta(days=day.weekday()) if period == 'week' else day
+
+def series_buckets(start, end, period):
+    step = timedelta(days=7 if period == 'week' else 1)
+    day = bucket_start(start, period)
+    buckets = []
+    while day <= end:
+        buckets.append(day.isoformat())
+        day += step
+    return buckets
+
+def rollup_increments(events):
+    # Sum events into {(scope, scope_id, period, bucket): [leads, responses, events]}
+    totals = {}
+    for event in events:
+        day = date.fromisoformat(event['day'])
+        scopes = (('campaign', event['campaign_id']), ('user', event['owner_id']), ('platform', event['platform']))
+        for scope, scope_id in scopes:
+            for period in PERIODS:
+                key = (scope, str(scope_id), period, bucket_start(day, period).isoformat())
+                total = totals.setdefault(key, [0, 0, 0])
+                total[0] += event['leads_delta']
+                total[1] += event['responses_delta']
+                total[2] += 1
+    return totals
+
+def rollup_rows(totals):
+    return [
+        {'scope': scope, 'scope_id': scope_id, 'period': period, 'bucket': bucket, 'leads': leads, 'responses': responses, 'events': events}
+        for (scope, scope_id, period, bucket), (leads, responses, events) in totals.items()
+    ]
+
+def fill_series(rows, buckets):
+    # One point per bucket, zeros where nothing happened
+    found = {row.bucket: row for row in rows}
+    points = []
+    for bucket in buckets:
+        row = found.get(bucket)
+        points.append({
+            'date': bucket,
+            'leads': row.leads if row else 0,
+            'responses': row.responses if row else 0,
+            'events': row.events if row else 0
+        })
+    return points
+
+def record_opening_events(conn, first_campaign_id=0):
+    # One event per campaign (from first_campaign_id on) with its current counters, dated on its creation day
+    conn.execute(text(
+        'INSERT INTO campaign_metric_event (campaign_id, owner_id, platform, day, recorded_at, leads_delta, responses_delta) '
+        'SELECT id, owner_id, platform, created_date, :now, COALESCE(leads_count, 0), COALESCE(responses_count, 0) FROM campaign '
+        'WHERE id >= :first_campaign_id AND (COALESCE(leads_count, 0) != 0 OR COALESCE(responses_count, 0) != 0)'
+    ), {'now': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'first_campaign_id': first_campaign_id})
+
+def rebuild_rollups(conn):
+    # Recompute every rollup from the event log
+    conn.execute(text('DELETE FROM campaign_metric_rollup'))
+    events = conn.execute(text('SELECT campaign_id, owner_id, platform, day, leads_delta, responses_delta FROM campaign_metric_event'))
+    rows = rollup_rows(rollup_increments(row._mapping for row in events))
+    if rows:
+        conn.execute(text(
+            'INSERT INTO campaign_metric_rollup (scope, scope_id, period, bucket, leads, responses, events) '
+            'VALUES (:scope, :scope_id, :period, :bucket, :leads, :responses, :events)'
+        ), rows)
+    return len(rows)